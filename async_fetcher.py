@@ -0,0 +1,57 @@
+# thin asyncio wrapper over the blocking fetch layer, for callers that
+# already run an event loop: each fetch is still a blocking getData call
+# on a worker thread, so it fetches no faster than
+# fetch_core.iterFetched (use that outside an event loop)
+# Python 3.7+ only (async def, asyncio.get_running_loop): nothing else
+# in the package imports this module, and its tests skip themselves on
+# older interpreters
+
+# Imports
+
+## asyncio - event loop and semaphore for concurrent fetching
+import asyncio
+
+## concurrent.futures - worker threads that run the blocking requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Async fetch wrapper
+
+## fetchParsers
+### coroutine that retrieves page data for every parser in a list,
+### keeping at most maxConcurrent requests in flight; parsers that
+### already hold page data are skipped
+### returns a list aligned with parsers holding None for each parser
+### that was filled in and the raised exception for each that failed
+###
+### each fetch goes through the parser's own getData, so sessions and
+### the rest of the fetch layer apply exactly as they do synchronously
+###
+### @PARAMS
+### 'parsers' (list): WLParser objects (PlayerParser, ClanParser, ...)
+### 'maxConcurrent' (int): maximum requests in flight (default: 10)
+async def fetchParsers(parsers, maxConcurrent=10):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(maxConcurrent)
+    with ThreadPoolExecutor(max_workers=maxConcurrent) as executor:
+
+        async def fetchOne(parser):
+            if hasattr(parser, 'pageData'): return None
+            async with semaphore:
+                try:
+                    await loop.run_in_executor(executor, parser.getData)
+                except Exception as error:
+                    return error
+            return None
+
+        return await asyncio.gather(*[fetchOne(parser)
+                                      for parser in parsers])
+
+## fetchAll
+### blocking wrapper for fetchParsers for callers without
+### an event loop of their own
+###
+### @PARAMS
+### 'parsers' (list): WLParser objects
+### 'maxConcurrent' (int): maximum requests in flight (default: 10)
+def fetchAll(parsers, maxConcurrent=10):
+    return asyncio.run(fetchParsers(parsers, maxConcurrent))
@@ -0,0 +1,63 @@
+import sys
+sys.path.append("..")
+
+# benchmark: decoding fetched pages with requests' default handling
+# (response.text) versus a fixed encoding (decodeResponse), for the
+# Content-Type headers a server may send
+# run from the bench directory: python decode_bench.py
+
+import timeit
+import requests
+from fetch_core import decodeResponse
+
+## headerCases
+### Content-Type headers compared: requests only runs charset detection
+### when there's no Content-Type at all; text/html without a charset is
+### decoded as ISO-8859-1 (garbling UTF-8 pages), as the HTTP spec says
+headerCases = ((None, "no Content-Type"),
+               ("text/html", "text/html"),
+               ("text/html; charset=utf-8", "charset=utf-8"))
+
+## makeResponse
+### builds a response holding roughly 'posts' forum posts, with its
+### encoding set from the headers the way requests sets it
+def makeResponse(posts, contentType):
+    post = (u'<table id="PostTbl_1" cellspacing="0" class="region">'
+            u'<a href="/Profile?p=1234">Jöhn – «player»</a>'
+            u'<div id="PostForDisplay_1"> This is a reasonably long '
+            u'forum message with some accents: café, naïve, Ø. </div>'
+            u'</table>\n')
+    response = requests.Response()
+    response.status_code = 200
+    if contentType is not None:
+        response.headers["Content-Type"] = contentType
+    response.encoding = requests.utils.get_encoding_from_headers(
+        response.headers)
+    response._content = (post * posts).encode("utf-8")
+    return response
+
+def bench(posts, repeat):
+    for contentType, label in headerCases:
+        response = makeResponse(posts, contentType)
+        encoding = response.encoding
+
+        def default():
+            response.encoding = encoding
+            return response.text
+
+        def fixed():
+            return decodeResponse(response, "utf-8")
+
+        correct = (default() == fixed())
+        defaultTime = min(timeit.repeat(default, number=1, repeat=repeat))
+        fixedTime = min(timeit.repeat(fixed, number=1, repeat=repeat))
+        size = len(response.content) / 1024.0
+        print("%8.0f KB  %-16s response.text %9.3f ms%s  fixed utf-8 "
+              "%7.3f ms  (x%.1f)"
+              % (size, label, defaultTime * 1000,
+                 "" if correct else " (garbled)", fixedTime * 1000,
+                 defaultTime / fixedTime))
+
+if __name__ == "__main__":
+    for posts in (20, 200, 2000):
+        bench(posts, 5)
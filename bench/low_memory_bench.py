@@ -0,0 +1,73 @@
+import sys
+sys.path.append("..")
+sys.path.append("../test")
+
+# benchmark: peak and retained memory while reading a long forum
+# thread, keeping every page's HTML versus releasing it (lowMemory)
+# run from the bench directory: python low_memory_bench.py
+
+import gc
+import re
+import tracemalloc
+from forum_parser import ForumThreadParser
+from fake_server import FakeResponse, withSession
+
+## ThreadSession
+### stand-in session serving a thread of 'length' posts, 20 per page,
+### each page wrapped in ~60 KB of site markup, as real pages are
+class ThreadSession(object):
+
+    splitter = ('" cellspacing="0" class="region" style="padding-bottom:'
+                '15px; width: 100%; max-width: 900px;')
+    chrome = ('<div class="navbar"><a href="/Forum/">Forum</a>'
+              '<script>var settings = {"theme": "dark"};</script></div>\n'
+              * 600)
+
+    def __init__(self, length):
+        self.length = length
+
+    def makePost(self, postID):
+        return (self.splitter + 'PostForDisplay_' + str(postID) + '">'
+                '<font color="#CCCCCC">title</font>: 09/01/2013 04:20:00'
+                '</th><a href="/Profile?p=' + str(postID % 50) + '">'
+                'player ' + str(postID % 50) + '</a>'
+                '<div id="PostForDisplay_' + str(postID) + '"> ' +
+                ("post %d says something about the game. " % postID) * 8 +
+                '</div>')
+
+    def get(self, URL, **kwargs):
+        offset = int(re.search("Offset=([0-9]+)", URL).group(1))
+        postIDs = range(offset, min(offset + 20, self.length))
+        return FakeResponse(self.chrome +
+                            '<title>Thread - Play Risk</title>Posts ' +
+                            str(offset + 1) + ' - ' +
+                            str(offset + len(postIDs)) + ' of ' +
+                            str(self.length) + '&nbsp;' +
+                            "".join(self.makePost(postID)
+                                    for postID in postIDs) +
+                            self.chrome)
+
+def measure(pages, lowMemory):
+    session = ThreadSession(pages * 20)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        thread = ForumThreadParser(1, lowMemory=lowMemory)
+        posts = withSession(session, thread.getPostData)
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(posts) == pages * 20
+    return current, peak
+
+def bench(pages):
+    for lowMemory in (None, "compress", "drop"):
+        current, peak = measure(pages, lowMemory)
+        print("%5d pages  lowMemory=%-10s  retained %7.1f MB  "
+              "peak %7.1f MB" % (pages, lowMemory, current / 1e6,
+                                 peak / 1e6))
+
+if __name__ == "__main__":
+    for pages in (50, 500):
+        bench(pages)
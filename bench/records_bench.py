@@ -0,0 +1,80 @@
+import sys
+sys.path.append("..")
+
+# benchmark: memory held by parsed ladder rankings with interned,
+# shared record fields versus the plain tuples they replace
+# run from the bench directory: python records_bench.py
+
+import gc
+import tracemalloc
+import ladder_parser
+from ladder_parser import LadderRankingParser
+
+## makePage
+### builds a ladder ranking page with 'teams' teams of 'size' players,
+### drawn from a small pool of clans and a larger pool of players
+def makePage(teams, size, page):
+    rows = list()
+    for team in range(teams):
+        teamID = page * teams + team
+        members = list()
+        for seat in range(size):
+            player = (teamID * size + seat) % 500
+            clan = player % 40
+            members.append('<a href="/Clans/?ID=%d" title="Clan %d">'
+                           '<img src="/Clans/%d.png"></a>'
+                           '<a href="LadderTeam?LadderTeamID=%d">'
+                           'Player %d</a> ' % (clan, clan, clan, teamID,
+                                               player))
+        rows.append('<tr ><td>%d</td><td>%s</td><td>%d</td></tr>'
+                    % (teamID + 1, "".join(members), 1500 + team % 300))
+    return ('</thead>' + "".join(rows) +
+            '<table class="LadderTeamsPager">')
+
+## copyString
+### returns a fresh copy of a string, undoing interning (the parser
+### kept a separate copy of every name before records)
+def copyString(value):
+    return "".join(list(value))
+
+def measure(pages, teams, size):
+    gc.collect()
+    tracemalloc.start()
+    results = list()
+    for page in range(pages):
+        parser = LadderRankingParser(1, 0)
+        parser.setData(makePage(teams, size, page))
+        results.append(parser.getLadderTeams())
+        del parser
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+## plainTuple
+### builds a plain tuple from its arguments, standing in for a record
+def plainTuple(*fields):
+    return fields
+
+def bench(pages, teams, size):
+    compact = measure(pages, teams, size)
+    saved = dict((name, getattr(ladder_parser, name)) for name in
+                 ("internString", "makeClan", "LadderPlayer", "LadderTeam"))
+    ladder_parser.internString = copyString
+    ladder_parser.makeClan = lambda clanID, clanName: (clanID,
+                                                       copyString(clanName))
+    ladder_parser.LadderPlayer = plainTuple
+    ladder_parser.LadderTeam = plainTuple
+    try:
+        plain = measure(pages, teams, size)
+    finally:
+        for name in saved:
+            setattr(ladder_parser, name, saved[name])
+    players = pages * teams * size
+    print("%8d players  plain tuples %8.1f MB  records %8.1f MB  (-%.0f%%)"
+          % (players, plain / 1e6, compact / 1e6,
+             100.0 * (plain - compact) / plain))
+
+if __name__ == "__main__":
+    for pages in (10, 100):
+        bench(pages, 50, 3)
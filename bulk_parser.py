@@ -0,0 +1,144 @@
+# Imports
+
+## multiprocessing - worker processes for CPU-bound extraction
+import multiprocessing
+
+## threading - bounds the pages waiting for a worker process
+import threading
+
+## fetch_core - fetches pages on a bounded window of threads
+from fetch_core import iterFetched
+
+# Pipeline helpers
+
+## JobWindow
+### counts the downloaded pages not yet handed back by a worker
+### process, so downloads stop running ahead of extraction (the pool
+### otherwise takes jobs as fast as they arrive)
+class JobWindow(object):
+
+    ## constructor
+    ###
+    ### @PARAMS
+    ### 'size' (int): number of pages allowed out at once
+    def __init__(self, size):
+        self.free = max(1, size)
+        self.closed = False
+        self.condition = threading.Condition()
+
+    ## acquire
+    ### waits for a free slot and takes it
+    ### returns False instead once the window is closed
+    def acquire(self):
+        with self.condition:
+            while self.free <= 0 and not self.closed:
+                self.condition.wait()
+            if self.closed: return False
+            self.free -= 1
+            return True
+
+    ## release
+    ### gives a slot back once its page has been extracted
+    def release(self):
+        with self.condition:
+            self.free += 1
+            self.condition.notify()
+
+    ## close
+    ### wakes every waiting download for good (see parseAll)
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+## detachParser
+### returns a shallow copy of a parser, sharing its session and caches,
+### to download into, so the caller's parser never holds the page
+###
+### @PARAMS
+### 'parser' (WLParser): parser to copy
+def detachParser(parser):
+    detached = parser.__class__.__new__(parser.__class__)
+    detached.__dict__.update(parser.__dict__)
+    return detached
+
+## iterDownloaded
+### generator that downloads pages on fetcher threads and yields
+### extraction jobs (parser, pageData, getters) in input order; page
+### data travels next to the parser, which is pickled without it
+### downloads run at most 'fetchers' pages ahead of the jobs taken,
+### and a job is only yielded once 'window' has a free slot
+###
+### @PARAMS
+### 'parsers' (iterable): parsers to download pages for
+### 'getters' (list): getter names to run on each page
+### 'fetchers' (int): number of fetcher threads
+### 'window' (JobWindow): slots for pages waiting to be extracted
+def iterDownloaded(parsers, getters, fetchers, window):
+    fetched = iterFetched((detachParser(parser) for parser in parsers),
+                          fetchers)
+    try:
+        for parser in fetched:
+            if not window.acquire(): return
+            yield (parser, parser.pageData, getters)
+    finally:
+        fetched.close()
+
+## extractPage
+### runs in a worker process: attaches page data to a parser and runs
+### each getter on it
+### returns a tuple (parser, values) where values maps getter names
+### to results, or (parser, error) if a getter raised an exception
+###
+### @PARAMS
+### 'job' (tuple): (parser, pageData, getters) from iterDownloaded
+def extractPage(job):
+    parser, pageData, getters = job
+    parser.setData(pageData)
+    try:
+        values = dict((getter, getattr(parser, getter)())
+                      for getter in getters)
+    except Exception as error:
+        return (parser, error)
+    return (parser, values)
+
+# Pipeline
+
+## parseAll
+### generator that downloads pages on fetcher threads and runs the
+### requested getters on them in a pool of worker processes, yielding
+### (parser, values) tuples as each page finishes (in completion order,
+### not input order); values is a dictionary {getter name: result}, or
+### the exception raised if a getter failed
+### the parsers yielded are copies, without page data (the ones passed
+### in are left as they were); at most 'readAhead' downloaded pages
+### wait for extraction at once; closing the generator early stops the
+### pool
+###
+### @PARAMS
+### 'parsers' (iterable): PlayerParser/ClanParser/... objects
+### 'getters' (list): getter names, e.g. ["getLevel", "getProfile"]
+### 'fetchers' (int): number of fetcher threads (default: 8)
+### 'processes' (int): number of worker processes
+###     (default: one per CPU)
+### 'readAhead' (int): number of downloaded pages waiting for a worker
+###     process (default: twice the number of processes)
+def parseAll(parsers, getters, fetchers=8, processes=None, readAhead=None):
+    if processes is None: processes = multiprocessing.cpu_count()
+    if readAhead is None: readAhead = 2 * processes
+    window = JobWindow(readAhead)
+    pool = multiprocessing.Pool(processes)
+    finished = False
+    try:
+        jobs = iterDownloaded(parsers, getters, fetchers, window)
+        for result in pool.imap_unordered(extractPage, jobs):
+            window.release()
+            yield result
+        finished = True
+    finally:
+        window.close()
+        if finished:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
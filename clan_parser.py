@@ -3,12 +3,27 @@
 ## parser_core - core parser class
 from parser_core import *
 
-## requests - to handle HTTP requests
-import requests
+## records - compact result records
+from records import internString, ClanMember
 
 # Main clan parser class
 class ClanParser(WLParser):
 
+    ## cacheTTL
+    ### clan pages change rarely; keep cached copies for a day
+    cacheTTL = 24 * 3600
+
+    ## schema
+    ### simple fields on a clan page, extracted together by getFields
+    schema = ExtractionSchema([
+        ("clanName", "<title>", " -", "text"),
+        ("memberCount", "Number of members:</font> ", None, "integer"),
+        ("link", 'Link:</font> <a rel="nofollow" href="', '">', "text"),
+        ("tagline", "Tagline:</font> ", "<br />", "text"),
+        ("createdDate", "Created:</font> ", "<br", WLParser.getDate),
+        ("bio", "Bio:</font>  ", "<br />", "text"),
+    ])
+
     ## constructor
     ### extends WLParser constructor with clan-specific URL
     ###
@@ -21,27 +36,22 @@ class ClanParser(WLParser):
 
     ## getClanName
     ### returns the name of a clan
-    @getPageData
+    ### (only the top of the page is fetched, if the page isn't loaded)
+    @getHeadData(("<title>", " -"))
     def getClanName(self):
-        page = self.pageData
-        return self.getValueFromBetween(page, "<title>", " -")
+        return self.getHeadField("clanName")
 
     ## getMemberCount
     ### returns a clan's member count
     @getPageData
     def getMemberCount(self):
-        page = self.pageData
-        marker = "Number of members:</font> "
-        return self.getIntegerValue(page, marker)
+        return self.getField("memberCount")
 
     ## getLink
     ### gets URL string for clan's designated link
     @getPageData
     def getLink(self):
-        page = self.pageData
-        marker = 'Link:</font> <a rel="nofollow" href="'
-        end = '">'
-        link = self.getValueFromBetween(page, marker, end)
+        link = self.getField("link")
         if link == "http://": return ""
         return link
 
@@ -49,35 +59,27 @@ class ClanParser(WLParser):
     ### returns clan tagline
     @getPageData
     def getTagline(self):
-        page = self.pageData
-        marker = 'Tagline:</font> '
-        end = '<br />'
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("tagline")
 
     ## getCreatedDate
     ### returns datetime object representing the creation date of a clan
     @getPageData
     def getCreatedDate(self):
-        page = self.pageData
-        marker = "Created:</font> "
-        end = "<br"
-        dateString = self.getValueFromBetween(page, marker, end)
-        return self.getDate(dateString)
+        return self.getField("createdDate")
 
     ## getBio
     ### returns clan bio from clan page
     @getPageData
     def getBio(self):
-        page = self.pageData
-        marker = "Bio:</font>  "
-        end = "<br />"
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("bio")
 
     ## getMembers
-    ### returns members of a clan in a list of tuples in the format:
+    ### returns members of a clan in a list of ClanMember records
+    ### (tuples) in the format:
     ### (playerID (int), playerName (string), playerTitle (string),
     ###  isMember (bool))
     @getPageData
+    @noMemo
     def getMembers(self):
         page = self.pageData
         marker = '<table class="dataTable">'
@@ -93,20 +95,18 @@ class ClanParser(WLParser):
             titleRange = dataPoint.split("<td>")[-1]
             playerTitle = self.getValueFromBetween(titleRange, "",
                           "</td")
-            data.append((playerID, playerName, playerTitle, isMember))
+            data.append(ClanMember(playerID, internString(playerName),
+                                   internString(playerTitle), isMember))
         return data
 
 # getClans
 ## returns a set of all clan IDs on warlight
 def getClans():
     URL = "https://www.warlight.net/Clans/List"
-    r = requests.get(URL)
+    r, pageData, failed = fetchText(URL)
     clanSet = set()
-    clanData = r.text.split("/Clans/?ID=")[1:]
+    clanData = pageData.split("/Clans/?ID=")[1:]
     for clan in clanData:
-        clanID = ""
-        while clan[0] in string.digits:
-            clanID += clan[0]
-            clan = clan[1:]
+        clanID = Scanner(clan).readTyped(string.digits)
         clanSet.add(int(clanID))
     return clanSet
\ No newline at end of file
@@ -0,0 +1,526 @@
+# Imports
+
+## threading - to guard creation of the shared session
+import threading
+
+## time, random - rate limiting and jittered backoff between retries
+import time
+import random
+
+## collections - queue of pending fetches
+from collections import deque
+
+## codecs - decoding streamed responses chunk by chunk
+import codecs
+
+## concurrent.futures - worker threads for parallel fetching
+from concurrent.futures import ThreadPoolExecutor
+
+# Session settings
+
+## sessionSettings
+### settings used when building the shared session
+### 'poolConnections' (int): number of per-host connection pools to keep
+### 'poolMaxSize' (int): maximum keep-alive connections per host
+### 'poolBlock' (bool): if True, never open more than poolMaxSize
+###     connections to a single host at once
+### 'timeout' (float or tuple): (connect, read) timeout in seconds
+sessionSettings = {
+    'poolConnections': 10,
+    'poolMaxSize': 20,
+    'poolBlock': False,
+    'timeout': (10, 60),
+}
+
+_sessionLock = threading.Lock()
+_session = None
+
+# Session functions
+
+## makeSession
+### builds a requests Session whose HTTP(S) adapters keep a pool
+### of keep-alive connections, sized according to sessionSettings
+### requests is imported here, on first use, so parsers given page data
+### offline never import it (or need it installed)
+###
+### @PARAMS
+### any sessionSettings key may be given to override the stored value
+def makeSession(**kwargs):
+    try:
+        import requests
+    except ImportError:
+        raise ImportError("requests is needed to fetch pages")
+    settings = dict(sessionSettings)
+    settings.update(kwargs)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+                  pool_connections=settings['poolConnections'],
+                  pool_maxsize=settings['poolMaxSize'],
+                  pool_block=settings['poolBlock'])
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+## configureSession
+### updates sessionSettings and replaces the shared session
+### with one built from the new settings
+###
+### @PARAMS
+### any sessionSettings key (see above)
+def configureSession(**kwargs):
+    global _session
+    for key in kwargs:
+        if key not in sessionSettings:
+            raise KeyError("Unknown session setting: " + str(key))
+    with _sessionLock:
+        sessionSettings.update(kwargs)
+        oldSession, _session = _session, makeSession()
+    if oldSession is not None: oldSession.close()
+
+## setSession
+### injects a caller-owned session (anything with a requests-style
+### get method) to be shared by every parser; None restores the default
+###
+### @PARAMS
+### 'session': session object to share
+def setSession(session):
+    global _session
+    with _sessionLock:
+        _session = session
+
+## getSession
+### returns the shared session, creating it on first use
+def getSession():
+    global _session
+    if _session is None:
+        with _sessionLock:
+            if _session is None:
+                _session = makeSession()
+    return _session
+
+## fetchPage
+### performs an HTTP GET request through a pooled session
+###
+### @PARAMS
+### 'URL' (string): address to fetch
+### 'session': session to use (default: shared session)
+### 'stream' (bool): if True, returns once the headers are in and leaves
+###     the body to be read from the response (default: False)
+### 'headers' (dict): extra request headers (default: None)
+def fetchPage(URL, session=None, stream=False, headers=None):
+    if session is None: session = getSession()
+    options = dict()
+    if stream: options['stream'] = True
+    if headers: options['headers'] = headers
+    return session.get(URL, timeout=sessionSettings['timeout'], **options)
+
+## decodeResponse
+### returns the text of a response
+### with no encoding given, defers to requests (response.text), which
+### runs charset detection over the whole body when the server sends
+### no charset; with a known encoding, decodes the raw bytes directly
+###
+### @PARAMS
+### 'response': response returned by fetchPage
+### 'encoding' (string): encoding to decode with (default: None)
+def decodeResponse(response, encoding=None):
+    if encoding is None: return response.text
+    return response.content.decode(encoding, "replace")
+
+## readHead
+### reads a streamed response in chunks until one of the stop markers
+### has been seen, then closes it, leaving the rest of the body unread
+### (its connection is dropped rather than reused)
+### a stop marker is a string, or a tuple of strings that must appear
+### in that order; the first one found ends the read
+### returns a tuple (text, complete): complete is False if the read
+### stopped early, True if the whole body was read
+###
+### @PARAMS
+### 'response': streamed response returned by fetchPage
+### 'stopMarkers' (list): markers to stop at
+### 'encoding' (string): encoding to decode with (default: the one
+###     given by the server, or utf-8)
+### 'chunkSize' (int): bytes read at a time (default: 16 KB)
+def readHead(response, stopMarkers, encoding=None, chunkSize=16384):
+    if encoding is None: encoding = response.encoding or "utf-8"
+    decoder = codecs.getincrementaldecoder(encoding)("replace")
+    sequences = [marker if isinstance(marker, tuple) else (marker,)
+                 for marker in stopMarkers]
+    progress = [[0, 0] for sequence in sequences]
+    text = ""
+    try:
+        for chunk in response.iter_content(chunkSize):
+            text += decoder.decode(chunk)
+            for sequence, state in zip(sequences, progress):
+                while state[0] < len(sequence):
+                    marker = sequence[state[0]]
+                    loc = text.find(marker, state[1])
+                    if loc == -1:
+                        state[1] = max(state[1], len(text) - len(marker) + 1)
+                        break
+                    state[0] += 1
+                    state[1] = loc + len(marker)
+                if state[0] == len(sequence):
+                    return text, False
+        return text + decoder.decode(b"", True), True
+    finally:
+        response.close()
+
+## hasStopMarker
+### returns True if one of the stop markers (see readHead) is in text
+###
+### @PARAMS
+### 'text' (string): text to search
+### 'stopMarkers' (list): markers to look for
+def hasStopMarker(text, stopMarkers):
+    for marker in stopMarkers:
+        sequence = marker if isinstance(marker, tuple) else (marker,)
+        pos = 0
+        for part in sequence:
+            pos = text.find(part, pos)
+            if pos == -1: break
+            pos += len(part)
+        else:
+            return True
+    return False
+
+# Rate limiting and retries
+
+## RateLimiter
+### token bucket shared by every fetch in the process: tokens refill at
+### 'rate' per second up to 'burst', and each request takes one
+class RateLimiter(object):
+
+    ## constructor
+    ###
+    ### @PARAMS
+    ### 'rate' (float): requests per second allowed on average
+    ### 'burst' (int): requests allowed back to back (default: 1)
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    ## acquire
+    ### takes a token, sleeping until one is available
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(self.burst, self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+## Backoff
+### retry policy: exponential backoff with full jitter and a retry cap
+### the delay before retry n is random between 0 and
+### min(cap, base * 2 ** n) seconds
+class Backoff(object):
+
+    ## constructor
+    ###
+    ### @PARAMS
+    ### 'base' (float): delay scale in seconds (default: 0.5)
+    ### 'cap' (float): maximum delay in seconds (default: 30)
+    ### 'retries' (int): retries before giving up (default: 5)
+    def __init__(self, base=0.5, cap=30.0, retries=5):
+        self.base = base
+        self.cap = cap
+        self.retries = retries
+
+    ## getDelay
+    ### returns the delay (in seconds) to wait before a retry
+    ###
+    ### @PARAMS
+    ### 'attempt' (int): number of the failed attempt, starting at 0
+    def getDelay(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+## ConcurrencyController
+### adaptive (AIMD) limit on requests in flight, shared by every fetch:
+### each healthy response raises the limit by 1/limit (about +1 per
+### round of requests); an error, or smoothed latency drifting past
+### slowFactor times the best smoothed latency seen, cuts it by
+### 'decrease' - at most once per round, since only requests started
+### after the last cut can trigger another
+### a latency cut also re-baselines to the current smoothed latency,
+### so a lasting slowdown costs a few cuts instead of pinning the
+### limit at its minimum
+### the current limit is exposed through 'limit' and getStats
+class ConcurrencyController(object):
+
+    ## constructor
+    ###
+    ### @PARAMS
+    ### 'initial' (int): starting limit (default: 4)
+    ### 'minimum' (int): lowest limit (default: 1)
+    ### 'maximum' (int): highest limit (default: 64)
+    ### 'decrease' (float): factor applied on a cut (default: 0.5)
+    ### 'slowFactor' (float): latency ratio counted as a slowdown
+    ###     (default: 2.0)
+    ### 'smoothing' (float): weight of each new latency sample in the
+    ###     moving average (default: 0.2)
+    def __init__(self, initial=4, minimum=1, maximum=64, decrease=0.5,
+                 slowFactor=2.0, smoothing=0.2):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.slowFactor = slowFactor
+        self.smoothing = smoothing
+        self.currentLimit = float(max(minimum, min(maximum, initial)))
+        self.inFlight = 0
+        self.latency = None
+        self.baseLatency = None
+        self.lastCut = 0.0
+        self.successes = 0
+        self.errors = 0
+        self.condition = threading.Condition()
+
+    ## limit
+    ### current limit on requests in flight
+    @property
+    def limit(self):
+        return int(self.currentLimit)
+
+    ## acquire
+    ### waits for a free slot and takes it
+    ### returns the start time, to be handed back to release
+    def acquire(self):
+        with self.condition:
+            while self.inFlight >= self.limit:
+                self.condition.wait()
+            self.inFlight += 1
+            return time.time()
+
+    ## release
+    ### frees a slot and adjusts the limit from the request's outcome
+    ###
+    ### @PARAMS
+    ### 'started' (float): start time returned by acquire
+    ### 'error' (bool): True if the request failed or was throttled
+    def release(self, started, error=False):
+        now = time.time()
+        with self.condition:
+            self.inFlight -= 1
+            slow = False
+            if error:
+                self.errors += 1
+            else:
+                self.successes += 1
+                sample = now - started
+                if self.latency is None: self.latency = sample
+                else: self.latency += self.smoothing * (sample -
+                                                        self.latency)
+                if (self.baseLatency is None or
+                    self.latency < self.baseLatency):
+                    self.baseLatency = self.latency
+                slow = (self.latency > self.slowFactor * self.baseLatency)
+            if error or slow:
+                if started >= self.lastCut:
+                    self.currentLimit = max(self.minimum,
+                                            self.currentLimit *
+                                            self.decrease)
+                    self.lastCut = now
+                    if slow: self.baseLatency = self.latency
+            else:
+                self.currentLimit = min(self.maximum, self.currentLimit +
+                                        1.0 / self.currentLimit)
+            self.condition.notify_all()
+
+    ## getStats
+    ### returns the controller's metrics as a dictionary
+    def getStats(self):
+        with self.condition:
+            return {"limit": self.limit, "inFlight": self.inFlight,
+                    "latency": self.latency,
+                    "baseLatency": self.baseLatency,
+                    "successes": self.successes, "errors": self.errors}
+
+_concurrencyController = None
+
+## setConcurrencyController
+### sets the concurrency controller shared by every parser;
+### None removes the adaptive limit
+def setConcurrencyController(controller):
+    global _concurrencyController
+    _concurrencyController = controller
+
+## getConcurrencyController
+### returns the shared concurrency controller (None if there's no limit)
+def getConcurrencyController():
+    return _concurrencyController
+
+_rateLimiter = None
+_backoff = Backoff()
+
+## setRateLimiter
+### sets the rate limiter shared by every parser; None disables limiting
+def setRateLimiter(rateLimiter):
+    global _rateLimiter
+    _rateLimiter = rateLimiter
+
+## getRateLimiter
+### returns the shared rate limiter (None if requests aren't limited)
+def getRateLimiter():
+    return _rateLimiter
+
+## setBackoff
+### sets the retry policy shared by every parser
+def setBackoff(backoff):
+    global _backoff
+    _backoff = backoff
+
+## getBackoff
+### returns the shared retry policy
+def getBackoff():
+    return _backoff
+
+## isRetryable
+### returns True if a response should be retried: throttling (429),
+### server errors (5xx), or a page holding the site's error marker
+###
+### @PARAMS
+### 'response': response returned by fetchPage
+### 'text' (string): decoded response text
+### 'errorMarker' (string): marker found on error pages (default: None)
+def isRetryable(response, text, errorMarker=None):
+    if response.status_code == 429 or response.status_code >= 500:
+        return True
+    return (errorMarker is not None and errorMarker in text)
+
+## fetchText
+### fetches a page within the shared rate limit and concurrency
+### limit (if set), retrying failed
+### requests and error pages with jittered exponential backoff
+### returns a tuple (response, text, failed): failed is True if retries
+### ran out on an error response (which is returned as is)
+### raises the last exception if retries run out on request errors
+###
+### @PARAMS
+### 'URL' (string): address to fetch
+### 'session': session to use (default: shared session)
+### 'encoding' (string): see decodeResponse (default: None)
+### 'errorMarker' (string): marker found on error pages (default: None)
+### 'retry' (bool): if False, makes a single attempt (default: True)
+### 'headers' (dict): extra request headers, e.g. the conditional
+###     headers from ValidatorStore.getHeaders (default: None)
+def fetchText(URL, session=None, encoding=None, errorMarker=None,
+              retry=True, headers=None):
+    read = lambda response: (decodeResponse(response, encoding), True)
+    response, (text, complete), failed = fetchWith(URL, read, session,
+                                                   errorMarker, retry,
+                                                   headers=headers)
+    return response, text, failed
+
+## fetchHead
+### like fetchText, but streams the page and stops reading once one of
+### the stop markers has been seen (see readHead), saving the download
+### and decoding of the rest of the page
+### returns a tuple (response, text, failed, complete): complete is
+### False if text is only the top of the page
+###
+### @PARAMS
+### 'URL' (string): address to fetch
+### 'stopMarkers' (list): markers to stop at (see readHead)
+### 'session': session to use (default: shared session)
+### 'encoding' (string): see readHead (default: None)
+### 'errorMarker' (string): marker found on error pages (default: None)
+### 'retry' (bool): if False, makes a single attempt (default: True)
+def fetchHead(URL, stopMarkers, session=None, encoding=None,
+              errorMarker=None, retry=True):
+    read = lambda response: readHead(response, stopMarkers, encoding)
+    response, (text, complete), failed = fetchWith(URL, read, session,
+                                                   errorMarker, retry,
+                                                   stream=True)
+    return response, text, failed, complete
+
+## fetchWith
+### helper for fetchText and fetchHead: requests a page within the
+### shared limits and reads it with 'read', retrying with backoff
+### returns a tuple (response, read result, failed)
+###
+### @PARAMS
+### 'URL' (string): address to fetch
+### 'read' (function): takes the response and returns a tuple
+###     (text, complete)
+### 'session': session to use (default: shared session)
+### 'errorMarker' (string): marker found on error pages (default: None)
+### 'retry' (bool): if False, makes a single attempt (default: True)
+### 'stream' (bool): see fetchPage (default: False)
+### 'headers' (dict): see fetchPage (default: None)
+def fetchWith(URL, read, session=None, errorMarker=None, retry=True,
+              stream=False, headers=None):
+    attempt = 0
+    while True:
+        rateLimiter = getRateLimiter()
+        if rateLimiter is not None: rateLimiter.acquire()
+        controller = getConcurrencyController()
+        if controller is not None: started = controller.acquire()
+        failed = True
+        try:
+            response = fetchPage(URL, session, stream, headers)
+            result = read(response)
+            failure = None
+            failed = isRetryable(response, result[0], errorMarker)
+        except Exception as error:
+            failure = error
+        finally:
+            if controller is not None:
+                controller.release(started, failed)
+        if not failed: return response, result, False
+        backoff = getBackoff()
+        if not retry or attempt >= backoff.retries:
+            if failure is not None: raise failure
+            return response, result, True
+        time.sleep(backoff.getDelay(attempt))
+        attempt += 1
+
+# Parallel fetching
+
+## loadPage
+### helper for iterFetched; makes sure a parser holds page data
+###
+### @PARAMS
+### 'parser' (WLParser): parser to load
+def loadPage(parser):
+    if not hasattr(parser, 'pageData'):
+        parser.getData()
+    return parser
+
+## iterFetched
+### generator that fetches the pages of several parsers on worker threads
+### and yields each parser, in the original order, once its page data
+### is loaded; keeps at most readAhead fetches queued, so parsers can
+### come from a lazy (even endless) iterable
+### closing the generator early cancels fetches that haven't started
+###
+### @PARAMS
+### 'parsers' (iterable): WLParser objects to load
+### 'workers' (int): number of fetches in flight (default: 8)
+### 'readAhead' (int): number of fetches queued ahead of the consumer
+###     (default: same as workers)
+def iterFetched(parsers, workers=8, readAhead=None):
+    if readAhead is None: readAhead = workers
+    readAhead = max(1, readAhead)
+    parsers = iter(parsers)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        for parser in parsers:
+            pending.append(executor.submit(loadPage, parser))
+            if len(pending) > readAhead:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -2,9 +2,29 @@
 # core parser class and functions
 from parser_core import *
 
+# compact result records
+from records import internString, makeClan, PostAuthor, ForumPost
+
+# parallel page fetching
+from fetch_core import iterFetched
+
+# itertools - endless offset counter for subforum pages
+import itertools
+
 # main forum parser class
 class ForumPageParser(WLParser):
 
+    ## cacheTTL
+    ### active threads move quickly; keep cached copies for 10 minutes
+    cacheTTL = 600
+
+    ## schema
+    ### simple fields on a thread page, extracted together by getFields
+    schema = ExtractionSchema([
+        ("title", "<title>", " - Play Risk", "text"),
+        ("lengthRange", "Posts ", "&nbsp;", "text"),
+    ])
+
     ## constructor
     ### takes a forum thread ID and offset
     def __init__(self, threadID, offset):
@@ -18,10 +38,7 @@ class ForumPageParser(WLParser):
     ### returns integer amount of total comments in thread
     @getPageData
     def getLength(self):
-        page = self.pageData
-        marker = "Posts "
-        end = "&nbsp;"
-        contentArea = self.getValueFromBetween(page, marker, end)
+        contentArea = self.getField("lengthRange")
         return self.getIntegerValue(contentArea, "of ")
 
     ## threadExists
@@ -37,8 +54,7 @@ class ForumPageParser(WLParser):
     @getPageData
     def isErrorPage(self):
         page = self.pageData
-        errorMarker = '<h1>Whoops, an error has occurred</h1>'
-        return (errorMarker in page)
+        return (self.errorMarker in page)
 
     ## pageExists
     ### returns a boolean determining whether a page is empty
@@ -58,21 +74,19 @@ class ForumPageParser(WLParser):
     ### returns thread title as a string
     @getPageData
     def getTitle(self):
-        before = "<title>"
-        after = " - Play Risk"
-        return self.getValueFromBetween(self.pageData,
-                                        before, after)
+        return self.getField("title")
 
     ## getPosts
-    ### returns posts on page as a list of tuples
+    ### returns posts on page as a list of ForumPost records (tuples)
     ### (ID, author, title, message, time)
-    ### where author is a tuple
+    ### where author is a PostAuthor record (tuple)
     ### (profile ID, username, memberStatus, clan)
     ### where clan is a tuple or None (if no clan)
     ### (clan ID, clan name)
     ###
     ###@TODO: split into helper functions
     @getPageData
+    @noMemo
     def getPosts(self):
         pageData = self.pageData
         splitter = '" cellspacing="0" class="region" style="padding-bottom:15px; width: 100%; max-width: 900px;'
@@ -109,39 +123,94 @@ class ForumPageParser(WLParser):
                 try:
                     clanName = self.getValueFromBetween(post, clanNameMarker,
                                                         clanNameEnd)
-                    clan = (clanID, clanName)
+                    clan = makeClan(clanID, clanName)
                 except:
                     clan = None
             else:
                 clan = None
-            author = (authorID, authorName, memberStatus, clan)
-            dataPoint = (ID, author, title, message, time)
+            author = PostAuthor(authorID, internString(authorName),
+                                memberStatus, clan)
+            dataPoint = ForumPost(ID, author, title, message, time)
             posts.append(dataPoint)
         return posts
 
 # forum thread parser
 class ForumThreadParser(object):
-    
+
+    ## keptFields
+    ### getters whose results are kept when pages are released
+    ### in low-memory mode
+    keptFields = ("getTitle", "getLength", "getPostCount")
+
     ## constructor
     ### takes a thread ID
-    def __init__(self, threadID, minOffset=0):
+    ### if workers is set, pages after the first are fetched concurrently
+    ### by that many threads instead of one after another
+    ### lowMemory releases each page's HTML once its posts are extracted
+    ### (see WLParser.releaseData): "compress" keeps a compressed copy,
+    ### "drop" discards it (None, the default, keeps pages as they are)
+    def __init__(self, threadID, minOffset=0, workers=None, lowMemory=None):
         self.ID = threadID
         self.minOffset = minOffset
+        self.workers = workers
+        if lowMemory not in (None, "compress", "drop"):
+            raise ValueError("Unknown lowMemory mode: " + str(lowMemory))
+        self.lowMemory = lowMemory
         self.pages = list()
+        self.keptPosts = dict()
+
+    ## addPage
+    ### keeps a page parser, releasing its page data in low-memory mode
+    ### (its posts are kept by offset, since getPosts isn't memoized)
+    def addPage(self, page):
+        if self.lowMemory is not None:
+            self.keptPosts[page.offset] = page.getPosts()
+            page.releaseData(self.lowMemory == "compress", self.keptFields)
+        self.pages.append(page)
+
+    ## getPagePosts
+    ### returns the posts on one of the thread's pages, in the format
+    ### returned by ForumPageParser.getPosts (kept ones for pages
+    ### released in low-memory mode)
+    def getPagePosts(self, page):
+        posts = self.keptPosts.get(page.offset)
+        if posts is None: return page.getPosts()
+        return list(posts)
 
     ## getPages
     ### retrieves page parsers
     def getPages(self):
+        if self.workers is not None:
+            return self.getPagesConcurrently()
         self.pages = list()
         threadEnded, offset = False, self.minOffset
         while (threadEnded is False):
             page = ForumPageParser(self.ID, offset)
             if page.pageExists():
-                self.pages.append(page)
+                self.addPage(page)
                 offset += 20
             else:
                 threadEnded = True
 
+    ## getPagesConcurrently
+    ### retrieves page parsers, using the first page's post count
+    ### to fetch every remaining page in parallel; pages are kept in
+    ### thread order and stop at the first missing page, as in getPages
+    def getPagesConcurrently(self):
+        self.pages = list()
+        firstPage = ForumPageParser(self.ID, self.minOffset)
+        if not firstPage.pageExists(): return
+        offsets = range(self.minOffset + 20, firstPage.getLength(), 20)
+        self.addPage(firstPage)
+        otherPages = [ForumPageParser(self.ID, offset)
+                      for offset in offsets]
+        pages = iterFetched(otherPages, self.workers)
+        for page in pages:
+            if not page.pageExists():
+                pages.close()
+                break
+            self.addPage(page)
+
     ## getPostData
     ### retrieves post data, updates posts, post count,
     ### and title
@@ -153,17 +222,69 @@ class ForumThreadParser(object):
         self.postCount = firstPage.getPostCount()
         self.posts = list()
         for page in self.pages:
-            postsInPage = page.getPosts()
+            postsInPage = self.getPagePosts(page)
             self.posts += postsInPage
         return self.posts
 
+# forum thread sync class
+## re-crawls threads without re-reading pages already seen
+## remembers, per thread, the last known post count and the IDs of the
+## posts on its final page; a refresh starts at that final page, so only
+## the (possibly partial) last page and any pages after it are fetched
+## checkpoints are kept in a JSON file:
+## {thread ID: {"length": post count, "postIDs": [IDs on final page]}}
+class ForumThreadSync(object):
+
+    ## constructor
+    ### takes the path of the checkpoint file (created on first save)
+    def __init__(self, path):
+        self.path = path
+        self.checkpoints = loadCheckpoints(path)
+
+    ## refresh
+    ### fetches posts added to a thread since its last refresh and
+    ### updates (and saves) its checkpoint
+    ### returns new posts as a list of tuples in the format returned by
+    ### ForumPageParser.getPosts (every post on a first refresh)
+    ###
+    ### @PARAMS
+    ### 'threadID' (int): thread to refresh
+    ### 'workers' (int): fetch new pages concurrently with this many
+    ###     threads (default: None, one page at a time)
+    def refresh(self, threadID, workers=None):
+        checkpoint = self.checkpoints.get(str(threadID))
+        if checkpoint is None:
+            offset, seenIDs = 0, set()
+        else:
+            offset = (checkpoint["length"] // 20) * 20
+            seenIDs = set(checkpoint["postIDs"])
+        thread = ForumThreadParser(threadID, offset, workers)
+        thread.getPages()
+        if len(thread.pages) == 0: return list()
+        posts = thread.getPostData()
+        newPosts = [post for post in posts if post[0] not in seenIDs]
+        length = thread.pages[0].getLength()
+        lastPage = thread.pages[-1]
+        self.checkpoints[str(threadID)] = {
+            "length": length,
+            "postIDs": [post[0] for post in thread.getPagePosts(lastPage)],
+        }
+        saveCheckpoints(self.path, self.checkpoints)
+        return newPosts
+
 # subforum page parser
 class SubforumPageParser(WLParser):
     
+    ## cacheTTL
+    ### thread listings reorder constantly; keep cached copies for 5 minutes
+    cacheTTL = 300
+
     ## constructor
-    ### needs a forum name
+    ### needs a forum name and an offset
     def __init__(self, forumName, offset):
         self.baseURL = ("https://www.warlight.net/Forum/" + forumName + "?")
+        self.forumName = forumName
+        self.offset = offset
         self.URL = self.makeURL(Offset=offset)
 
     ## fetchThreads
@@ -171,12 +292,15 @@ class SubforumPageParser(WLParser):
     ### (thread name, thread author name,
     ###  post count, last post datetime, last post author)
     @getPageData
+    @noMemo
     def fetchThreads(self):
         threads = list()
-        if (self.threadExists() == False):
+        if (self.threadsExist() == False):
             return threads
         contentBreaker = '<th>Last&nbsp;Post</th>'
         pageLoc = self.pageData.find(contentBreaker)
+        if (pageLoc == -1):
+            return threads
         pageData = self.pageData[pageLoc:]
         threadSplitter = '<tr>'
         threadData = pageData.split(threadSplitter)[1:]
@@ -191,14 +315,13 @@ class SubforumPageParser(WLParser):
             postCount = self.getIntegerValue(dataPoint,
                         '<td nowrap="nowrap">')
             dateBreaker = 'padding-right:15px">'
-            dateLoc = dataPoint.find(dateBreaker)
+            dateLoc = dataPoint.find(dateBreaker) + len(dateBreaker)
             dataPoint = self.trimString(dataPoint[dateLoc:])
             date = self.getDateTime(self.getValueFromBetween(
                                     dataPoint, "", "      "))
             latestAuthor = self.getValueFromBetween(dataPoint,
                            '#C6C6C6">by ', "</span>")
-            threads.append((title, author, postCount,
-                            postCount, date, latestAuthor))
+            threads.append((title, author, postCount, date, latestAuthor))
         return threads
 
     ## threadsExist
@@ -209,56 +332,66 @@ class SubforumPageParser(WLParser):
         return (threadsMarker not in self.pageData)
 
 # subforum parser
-## scrapes a whole subforum
+## scrapes a whole subforum, newest activity first
 class SubforumParser(object):
 
     ## constructor
     ### takes forumName, cutoffTime (default None) - datetime object,
-    ### minOffset (default 0)
-    def __init__(self, forumName, cutoffTime=None, minOffset=0):
+    ### minOffset (default 0), workers (default 4) - number of listing
+    ### pages fetched concurrently ahead of the consumer
+    def __init__(self, forumName, cutoffTime=None, minOffset=0, workers=4):
         self.forumName = forumName
         self.cutoff = cutoffTime
-        self.minOffset = None
+        self.minOffset = minOffset
+        self.workers = workers
         self.pages = list()
 
+    ## iterPages
+    ### generator over listing pages as tuples (page parser, threads)
+    ### the first page gives the page size; later pages are prefetched
+    ### concurrently; stops after the page holding the last thread
+    ### active after the cutoff, or at the first empty or partial page
+    def iterPages(self):
+        firstPage = SubforumPageParser(self.forumName, self.minOffset)
+        threads = firstPage.fetchThreads()
+        pageSize = len(threads)
+        if (pageSize == 0): return
+        otherPages = (SubforumPageParser(self.forumName, offset)
+                      for offset in itertools.count(self.minOffset +
+                                                    pageSize, pageSize))
+        pages = iterFetched(itertools.chain([firstPage], otherPages),
+                            self.workers)
+        try:
+            for page in pages:
+                threads = page.fetchThreads()
+                if (len(threads) == 0): return
+                yield page, threads
+                if (self.cutoff is not None and
+                    threads[-1][3] <= self.cutoff):
+                    return
+                if (len(threads) < pageSize): return
+        finally:
+            pages.close()
+
+    ## iterThreads
+    ### generator over threads, in the format returned by
+    ### SubforumPageParser.fetchThreads, stopping at the first thread
+    ### whose last post isn't newer than the cutoff
+    def iterThreads(self):
+        for page, threads in self.iterPages():
+            for thread in threads:
+                if (self.cutoff is not None and thread[3] <= self.cutoff):
+                    return
+                yield thread
+
     ## getPages
-    ### generates subforum page parsers and stores them
+    ### generates subforum page parsers, stores them and returns them
     def getPages(self):
-        self.pages = list()
-        emptyPages, offset = False, minOffset
-        while (emptyPages == False):
-            pageParser = SubforumPageParser(self.forumName,
-                                              offset)
-            postsOnPage = pageParser.threadsExist()
-            if postsOnPage:
-                threadsOnPage = pageParser.fetchThreads()
-                firstThreadTime = threadsOnPage[-1][1]
-                if self.cutoff is None or firstThreadTime > self.cutoff:
-                    self.pages.append(pageParser)
-                else: # cutoff is not None and firstThreadTime is too old
-                    emptyPages = True
-            else:
-                emptyPages = True
+        self.pages = [page for page, threads in self.iterPages()]
+        return self.pages
 
-    ## getPosts
-    ### returns posts as list of tuples
+    ## fetchThreads
+    ### returns threads as a list of tuples
     ### in format returned by SubforumPageParser
     def fetchThreads(self):
-        threads = list()
-        if (len(self.pages) == 0):
-            self.getPages()
-        for i in xrange(len(self.pages)):
-            page = self.pages[i]
-            posts = page.fetchThreads()
-            if (i == len(self.pages) - 1):
-                skipRemaining = False
-                for post in posts:
-                    if skipRemaining: break
-                    postTime = post[3]
-                    if postTime > self.cutoff:
-                        threads.append(post)
-                    else:
-                        skipRemaining = True
-            else:
-                threads += posts
-        return posts
\ No newline at end of file
+        return list(self.iterThreads())
@@ -0,0 +1,181 @@
+# Imports
+
+## numpy - column arrays for vectorized analysis
+## (optional: without it, exports stay as array.array columns)
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## array - compact typed columns, filled while parsing
+from array import array
+
+## calendar - end dates as epoch seconds
+import calendar
+
+## ladder_parser - ladder pages and their row readers
+from ladder_parser import LadderParser, iterHistoryPages
+
+# Column layouts
+## each field is a tuple (name, array typecode, NumPy dtype)
+
+## int64Code
+### array typecode for 64-bit integers: 'q' where it exists (Python
+### 3.3+), otherwise 'l' if that is 64 bits wide (Python 2 on 64-bit
+### Linux and macOS)
+try:
+    int64Code = array("q").typecode
+except ValueError:
+    int64Code = "l"
+    if array(int64Code).itemsize != 8:
+        raise ImportError("ladder_export needs 64-bit integer arrays")
+
+## teamFields
+### one row per ranked (or unranked, rank 0) team
+teamFields = (("teamID", int64Code, "int64"),
+              ("teamRank", int64Code, "int64"),
+              ("rankShift", int64Code, "int64"),
+              ("teamRating", int64Code, "int64"))
+
+## gameFields
+### one row per game; endTime is in seconds since the epoch (as
+### datetime64[s] in NumPy), missing for games that haven't finished;
+### alphaTeam and betaTeam are the winner and loser of finished games
+gameFields = (("gameID", int64Code, "int64"),
+              ("endTime", int64Code, "datetime64[s]"),
+              ("alphaTeam", int64Code, "int64"),
+              ("betaTeam", int64Code, "int64"),
+              ("finished", "B", "bool"),
+              ("expired", "B", "bool"))
+
+## missingTime
+### endTime stored for games without an end date (NumPy's NaT)
+missingTime = -2 ** 63
+
+# Column table class
+## a table kept as one typed array per field instead of one tuple
+## per row: a 100k-game history takes a few MB and converts to NumPy
+## without copying
+class Columns(object):
+
+    ## constructor
+    ###
+    ### @PARAMS
+    ### 'fields' (tuple): column layout (teamFields, gameFields, ...)
+    def __init__(self, fields):
+        self.fields = fields
+        self.columns = dict((name, array(typecode))
+                            for name, typecode, dtype in fields)
+
+    ## __len__
+    ### returns the number of rows
+    def __len__(self):
+        return len(self.columns[self.fields[0][0]])
+
+    ## __getitem__
+    ### returns a column (array.array) by name
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    ## toNumpy
+    ### returns the columns as a dictionary {name: NumPy array}
+    ### the arrays share memory with the columns (no copy is made),
+    ### so the table can't grow while they're in use
+    ### raises ImportError if NumPy isn't installed
+    def toNumpy(self):
+        if numpy is None:
+            raise ImportError("numpy is needed to build NumPy arrays")
+        return dict((name, numpy.asarray(self.columns[name]).view(dtype))
+                    for name, typecode, dtype in self.fields)
+
+# Row readers
+
+## addTeamRows
+### appends the teams on a ranking page to a teamFields table,
+### reading only the columns (players are skipped)
+###
+### @PARAMS
+### 'rankParser' (LadderRankingParser): page to read
+### 'columns' (Columns): table to append to
+### 'rankedOnly' (bool): skip unranked teams (default: False)
+def addTeamRows(rankParser, columns, rankedOnly=False):
+    teamIDs, ranks = columns["teamID"], columns["teamRank"]
+    shifts, ratings = columns["rankShift"], columns["teamRating"]
+    for dataPoint in rankParser.getTeamRows():
+        teamRank = rankParser.readTeamRank(dataPoint)
+        if rankedOnly and teamRank == 0: continue
+        teamIDs.append(rankParser.readTeamID(dataPoint))
+        ranks.append(teamRank)
+        shifts.append(rankParser.readRankShift(dataPoint))
+        ratings.append(rankParser.readTeamRating(dataPoint))
+
+## addGameRows
+### appends the games on a history page to a gameFields table
+### returns False once a finished game older than 'since' is reached
+### (that game and the rest of the page are left out), True otherwise
+###
+### @PARAMS
+### 'historyParser' (LadderHistoryParser): page to read
+### 'columns' (Columns): table to append to
+### 'since' (datetime): oldest end date to keep (default: None)
+### 'returnExpired' (bool): keep expired games (default: True)
+def addGameRows(historyParser, columns, since=None, returnExpired=True):
+    gameIDs, endTimes = columns["gameID"], columns["endTime"]
+    alphaTeams, betaTeams = columns["alphaTeam"], columns["betaTeam"]
+    finishedFlags, expiredFlags = columns["finished"], columns["expired"]
+    for dataPoint in historyParser.getGameRows():
+        expired = historyParser.isExpired(dataPoint)
+        if expired and not returnExpired: continue
+        gameTime = historyParser.readGameTime(dataPoint)
+        if gameTime == "":
+            endTime = missingTime
+        else:
+            endDate = historyParser.getDateTime(gameTime)
+            if since is not None and endDate < since: return False
+            endTime = calendar.timegm(endDate.timetuple())
+        alphaTeam, betaTeam, finished = historyParser.readGameTeams(dataPoint)
+        gameIDs.append(historyParser.readGameID(dataPoint))
+        endTimes.append(endTime)
+        alphaTeams.append(alphaTeam)
+        betaTeams.append(betaTeam)
+        finishedFlags.append(finished)
+        expiredFlags.append(expired)
+    return True
+
+# Exporters
+
+## exportTeams
+### reads a whole ladder's rankings into a teamFields table
+### (see LadderParser.getTeams); call toNumpy on it for NumPy arrays
+###
+### @PARAMS
+### 'ladderID' (int): ladder to read
+### 'rankedOnly' (bool): leave out unranked teams (default: False)
+### 'workers' (int): number of pages fetched at once (default: 8)
+def exportTeams(ladderID, rankedOnly=False, workers=8):
+    columns = Columns(teamFields)
+    for rankParser in LadderParser(ladderID).iterPages(rankedOnly, workers):
+        addTeamRows(rankParser, columns, rankedOnly)
+    return columns
+
+## exportGames
+### reads a ladder's game history, newest first, into a gameFields
+### table (see iterGames); call toNumpy on it for NumPy arrays
+###
+### @PARAMS
+### 'ladderID' (int): ladder to read
+### 'since' (datetime): stops at the first finished game that ended
+###     before this time (default: None, reads the whole history)
+### 'prefetch' (int): number of pages fetched ahead (default: 2)
+### 'returnExpired' (bool): keep expired games (default: True)
+def exportGames(ladderID, since=None, prefetch=2, returnExpired=True):
+    columns = Columns(gameFields)
+    pages = iterHistoryPages(ladderID, prefetch)
+    try:
+        for historyParser in pages:
+            if not addGameRows(historyParser, columns, since,
+                               returnExpired):
+                break
+    finally:
+        pages.close()
+    return columns
@@ -3,6 +3,16 @@
 ## parser core - mainly the core parser class
 from parser_core import *
 
+## records - compact result records
+from records import (internString, makeClan, LadderPlayer, LadderTeam,
+                     LadderGame)
+
+## fetch_core - parallel page fetching
+from fetch_core import iterFetched
+
+## itertools - endless offset counter for history pages
+import itertools
+
 # LadderParser class
 class LadderParser(WLParser):
 
@@ -29,6 +39,43 @@ class LadderParser(WLParser):
         trimmedTeams = [team for team in teams if team[1] != 0]
         return trimmedTeams
 
+    ## iterPages
+    ### generator over the ladder's ranking pages, in order, yielding a
+    ### LadderRankingParser for each; stops after the first empty page
+    ### (or, with rankedOnly, the first page holding unranked teams),
+    ### judged once the caller has read it
+    ###
+    ### pages are fetched concurrently: the ladder size gives the
+    ### number of ranking pages up front; if the ladder has grown past
+    ### that, the remaining pages are walked one at a time
+    ###
+    ### @PARAMS
+    ### 'rankedOnly' (bool): stop at the first page with unranked teams
+    ###     (default: False)
+    ### 'workers' (int): number of pages fetched at once (default: 8)
+    def iterPages(self, rankedOnly=False, workers=8):
+        pageCount = -(-self.getSize() // 50)
+        rankParsers = [LadderRankingParser(self.ID, offset)
+                       for offset in range(0, pageCount * 50, 50)]
+        offset = 0
+        pages = iterFetched(rankParsers, workers)
+        try:
+            for rankParser in pages:
+                yield rankParser
+                offset += 50
+                if ((rankParser.isEmpty) or
+                    (rankedOnly and rankParser.hasUnranked)):
+                    return
+        finally:
+            pages.close()
+        while True:
+            rankParser = LadderRankingParser(self.ID, offset)
+            yield rankParser
+            if ((rankParser.isEmpty) or
+                (rankedOnly and rankParser.hasUnranked)):
+                return
+            offset += 50
+
     ## getTeams
     ### returns teams from the ladder as a list of tuples:
     ### (teamID, teamRank, rankShift, teamRating, players)
@@ -36,17 +83,15 @@ class LadderParser(WLParser):
     ### (playerName, clan)
     ### where clan is a tuple:
     ### (clanID, clanName) - (None, "") if no clan
-    def getTeams(self, rankedOnly=False):
-        offset = 0
-        stop = False
+    ###
+    ### @PARAMS
+    ### 'rankedOnly' (bool): stop at the first page with unranked teams
+    ###     and drop unranked teams (default: False)
+    ### 'workers' (int): number of pages fetched at once (default: 8)
+    def getTeams(self, rankedOnly=False, workers=8):
         allTeams = list()
-        while(not stop):
-            rankParser = LadderRankingParser(self.ID, offset)
+        for rankParser in self.iterPages(rankedOnly, workers):
             allTeams += rankParser.getLadderTeams()
-            if ((rankParser.isEmpty) or 
-                (rankedOnly and rankParser.hasUnranked)):
-                stop = True
-            offset += 50
         if rankedOnly: 
             allTeams = self.trimUnranked(allTeams)
         self.allTeams = allTeams
@@ -57,6 +102,10 @@ class LadderParser(WLParser):
 ## retrieves up to 50 teams at once
 class LadderRankingParser(WLParser):
 
+    ## cacheTTL
+    ### rankings update through the day; keep cached copies for 30 minutes
+    cacheTTL = 1800
+
     ## constructor
     ### needs a ladder ID and an offset
     def __init__(self, ladderID, offset):
@@ -65,71 +114,108 @@ class LadderRankingParser(WLParser):
         self.hasUnranked = False
         self.isEmpty = False
 
-    ## getLadderTeams
-    ### returns teams given a page of the ladder
-    ### list of tuples:
-    ### (teamID, teamRank, rankShift, teamRating, players)
-    ### where player is a list of tuples:
-    ### (playerName, (clanID, clanName))
-    ###
-    ### @TODO: break up into multiple functions
+    ## getTeamRows
+    ### returns the page's team rows as a list of strings
+    ### (marks the page as empty if there are none)
     @getPageData
-    def getLadderTeams(self):
+    @noMemo
+    def getTeamRows(self):
         page = self.pageData
         marker = '</thead>'
         end = '<table class="LadderTeamsPager">'
         dataRange = self.getValueFromBetween(page, marker, end)
-        teams = list()
-        if ("<tr >" not in dataRange): 
+        if ("<tr >" not in dataRange):
             self.isEmpty = True
-            return teams
-        dataSet = dataRange.split("<tr >")[1:]
+            return list()
+        return dataRange.split("<tr >")[1:]
+
+    ## readTeamRank
+    ### returns the rank (0 if unranked) in a team row
+    def readTeamRank(self, dataPoint):
+        if ("<td>Not Ranked </td>" in dataPoint):
+            self.hasUnranked = True
+            return 0
+        return self.getIntegerValue(dataPoint, "<td>")
+
+    ## readRankShift
+    ### returns the rank change (positive for a climb) in a team row
+    @staticmethod
+    def readRankShift(dataPoint):
         upArrow = 'img src="/Images/UpArrow.png"'
         downArrow = 'img src="/Images/DownArrow.png"'
-        for dataPoint in dataSet:
-            if ("<td>Not Ranked </td>" in dataPoint):
-                teamRank = 0
-                self.hasUnranked = True
-            else:
-                teamRank = self.getIntegerValue(dataPoint, "<td>")
-            rankShift = (dataPoint.count(upArrow) - 
-                         dataPoint.count(downArrow))
-            teamMarker = 'LadderTeam?LadderTeamID='
-            teamID = self.getIntegerValue(dataPoint, teamMarker)
-            teamIDString = teamMarker + str(teamID)
-            players = list()
-            dataList = dataPoint.split("<a ")
-            currentClanID, currentClanName = None, ""
-            clanIDMarker = '"/Clans/?ID='
-            clanNameMarker = '" title="'
-            clanNameEnd = '">'
-            nameMarker = teamIDString + '">'
-            nameEnd = '</a'
-            for dataUnit in dataList:
-                if clanIDMarker in dataUnit and clanNameMarker in dataUnit:
-                    currentClanID = self.getIntegerValue(dataUnit, clanIDMarker)
-                    currentClanName = self.getValueFromBetween(dataUnit,
-                                      clanNameMarker, clanNameEnd)
-                elif nameMarker in dataUnit and nameEnd in dataUnit:
-                    playerName = self.getValueFromBetween(dataUnit,
-                                 nameMarker, nameEnd)
-                    players.append((playerName,
-                                    (currentClanID, currentClanName)))
-                    currentClanID = None
-                    currentClanName = ""
-                else: continue
-            ratingRange = dataPoint.split("<td>")[-1]
-            if len(ratingRange) < 1 or (ratingRange[0] not in string.digits):
-                teamRating = 0
-            else:
-                teamRating = self.getIntegerValue(ratingRange, "")
-            teams.append((teamID, teamRank, rankShift, teamRating,
-                          players))
+        return (dataPoint.count(upArrow) - dataPoint.count(downArrow))
+
+    ## readTeamID
+    ### returns the team ID in a team row
+    @classmethod
+    def readTeamID(cls, dataPoint):
+        return cls.getIntegerValue(dataPoint, 'LadderTeam?LadderTeamID=')
+
+    ## readTeamRating
+    ### returns the rating (0 if not rated) in a team row
+    @classmethod
+    def readTeamRating(cls, dataPoint):
+        ratingRange = dataPoint.split("<td>")[-1]
+        if len(ratingRange) < 1 or (ratingRange[0] not in string.digits):
+            return 0
+        return cls.getIntegerValue(ratingRange, "")
+
+    ## readPlayers
+    ### returns the players in a team row as a list of LadderPlayer
+    ### records (tuples): (playerName, (clanID, clanName))
+    @classmethod
+    def readPlayers(cls, dataPoint, teamID):
+        teamIDString = 'LadderTeam?LadderTeamID=' + str(teamID)
+        players = list()
+        dataList = dataPoint.split("<a ")
+        currentClanID, currentClanName = None, ""
+        clanIDMarker = '"/Clans/?ID='
+        clanNameMarker = '" title="'
+        clanNameEnd = '">'
+        nameMarker = teamIDString + '">'
+        nameEnd = '</a'
+        for dataUnit in dataList:
+            if clanIDMarker in dataUnit and clanNameMarker in dataUnit:
+                currentClanID = cls.getIntegerValue(dataUnit, clanIDMarker)
+                currentClanName = cls.getValueFromBetween(dataUnit,
+                                  clanNameMarker, clanNameEnd)
+            elif nameMarker in dataUnit and nameEnd in dataUnit:
+                playerName = cls.getValueFromBetween(dataUnit,
+                             nameMarker, nameEnd)
+                players.append(LadderPlayer(internString(playerName),
+                               makeClan(currentClanID, currentClanName)))
+                currentClanID = None
+                currentClanName = ""
+            else: continue
+        return players
+
+    ## getLadderTeams
+    ### returns teams given a page of the ladder
+    ### list of LadderTeam records (tuples):
+    ### (teamID, teamRank, rankShift, teamRating, players)
+    ### where players is a list of LadderPlayer records (tuples):
+    ### (playerName, (clanID, clanName))
+    @getPageData
+    @noMemo
+    def getLadderTeams(self):
+        teams = list()
+        for dataPoint in self.getTeamRows():
+            teamRank = self.readTeamRank(dataPoint)
+            rankShift = self.readRankShift(dataPoint)
+            teamID = self.readTeamID(dataPoint)
+            players = self.readPlayers(dataPoint, teamID)
+            teamRating = self.readTeamRating(dataPoint)
+            teams.append(LadderTeam(teamID, teamRank, rankShift, teamRating,
+                                    players))
         return teams
 
 # parser class to fetch history of a ladder, 50 games at a time
 class LadderHistoryParser(WLParser):
 
+    ## cacheTTL
+    ### new games finish all the time; keep cached copies for 10 minutes
+    cacheTTL = 600
+
     ## constructor
     ### takes a ladder ID and an offset (ideally a multiple of 50)
     def __init__(self, ladderID, offset):
@@ -139,55 +225,82 @@ class LadderHistoryParser(WLParser):
         self.earliestTime = None
         self.gameMarker = '<tr style="background-color: inherit">'
 
+    ## getGameRows
+    ### returns the page's game rows as a list of strings
+    ### (marks the page as empty if there are none)
+    @getPageData
+    def getGameRows(self):
+        page = self.pageData
+        marker = "</thead>"
+        end = '<div class="LadderGamesPager'
+        dataRange = self.getValueFromBetween(page, marker, end)
+        gameMarker = self.gameMarker
+        if gameMarker not in dataRange:
+            self.isEmpty = True
+            return list()
+        return dataRange.split(gameMarker)[1:]
+
+    ## isExpired
+    ### returns True if a game row is for an expired game
+    @staticmethod
+    def isExpired(dataPoint):
+        return "</a> (expired)" in dataPoint
+
+    ## readGameID
+    ### returns the game ID in a game row
+    @classmethod
+    def readGameID(cls, dataPoint):
+        return cls.getIntegerValue(dataPoint, 'MultiPlayer?GameID=')
+
+    ## readGameTime
+    ### returns the end date and time in a game row as a string
+    ### ("" if the game hasn't finished)
+    @classmethod
+    def readGameTime(cls, dataPoint):
+        return cls.getValueFromBetween(dataPoint,
+                                       'style="white-space: nowrap">',
+                                       '</td>')
+
+    ## readGameTeams
+    ### returns the teams in a game row as a tuple
+    ### (alphaTeam, betaTeam, finished) - see getGameHistory
+    @classmethod
+    def readGameTeams(cls, dataPoint):
+        if "defeated" in dataPoint:
+            alphaData, betaData = dataPoint.split("defeated")
+            finished = True
+        else:
+            alphaData, betaData = dataPoint.split(" vs ")
+            finished = False
+        alphaTeam = cls.getIntegerValue(alphaData, '?LadderTeamID=')
+        betaTeam = cls.getIntegerValue(betaData, '?LadderTeamID=')
+        return alphaTeam, betaTeam, finished
+
     ## getGameHistory
-    ### returns game history of a ladder as list of tuples:
+    ### returns game history of a ladder as list of LadderGame records
+    ### (tuples):
     ### (gameID, gameTime, alphaTeam, betaTeam, finished, endDate, expired)
     ### gameTime is a datetime object
     ### alphaTeam is the winning team if a game is finished
     ### betaTeam is the losing team if a game is finished
     ### finished is a boolean
     ### endDate is None if finished is False
-    ###
-    ### @TODO: break up into multiple functions
     @getPageData
+    @noMemo
     def getGameHistory(self, returnExpired=True):
-        page = self.pageData
         games = list()
-        marker = "</thead>"
-        end = '<div class="LadderGamesPager'
-        dataRange = self.getValueFromBetween(page, marker, end)
-        gameMarker = self.gameMarker
-        if gameMarker not in dataRange: 
-            self.isEmpty = True
-            return games
-        dataSet = dataRange.split(gameMarker)[1:]
-        for dataPoint in dataSet:
-            expired = False
-            if "</a> (expired)" in dataPoint:
-                expired = True
-                if (returnExpired == False):
-                    continue
-            multiMarker = 'MultiPlayer?GameID='
-            gameID = self.getIntegerValue(dataPoint,
-                                          multiMarker)
-            gameTime = self.getValueFromBetween(dataPoint,
-                       'style="white-space: nowrap">',
-                       '</td>')
+        for dataPoint in self.getGameRows():
+            expired = self.isExpired(dataPoint)
+            if expired and (returnExpired == False):
+                continue
+            gameID = self.readGameID(dataPoint)
+            gameTime = self.readGameTime(dataPoint)
             if gameTime == "": endDate = None
             else: endDate = self.getDateTime(gameTime)
-            if "defeated" in dataPoint:
-                alphaData, betaData = dataPoint.split("defeated")
-                finished = True
-
-            else:
-                alphaData, betaData = dataPoint.split(" vs ")
-                finished = False
-            alphaTeam = self.getIntegerValue(alphaData,
-                        '?LadderTeamID=')
-            betaTeam = self.getIntegerValue(betaData,
-                       '?LadderTeamID=')
-            games.append((gameID, gameTime, alphaTeam, betaTeam, finished,
-                          endDate, expired))
+            alphaTeam, betaTeam, finished = self.readGameTeams(dataPoint)
+            games.append(LadderGame(gameID, gameTime,
+                                    alphaTeam, betaTeam, finished,
+                                    endDate, expired))
             self.earliestTime = gameTime
         return games
 
@@ -201,4 +314,107 @@ class LadderTeamHistoryParser(LadderHistoryParser):
         self.URL = self.makeURL(ID=ladderID, LadderTeamID=teamID, Offset=offset)
         self.isEmpty = False
         self.earliestTime = None
-        self.gameMarker = '<tr style="background-color: '
\ No newline at end of file
+        self.gameMarker = '<tr style="background-color: '
+
+# iterHistoryPages
+## generator over a ladder's history pages, newest first, yielding a
+## LadderHistoryParser for each once its page data is loaded; stops
+## after the first empty page, judged once the caller has read it
+## pages are requested lazily, prefetch pages ahead of the consumer
+##
+## @PARAMS
+## 'ladderID' (int): ladder to walk
+## 'prefetch' (int): number of pages fetched ahead (default: 2)
+def iterHistoryPages(ladderID, prefetch=2):
+    historyParsers = (LadderHistoryParser(ladderID, offset)
+                      for offset in itertools.count(0, 50))
+    pages = iterFetched(historyParsers, prefetch, prefetch)
+    try:
+        for historyParser in pages:
+            yield historyParser
+            if historyParser.isEmpty: return
+    finally:
+        pages.close()
+
+# iterGames
+## generator over a ladder's whole game history, newest first,
+## yielding game tuples in the format returned by getGameHistory
+## pages are requested lazily, prefetch pages ahead of the consumer,
+## so memory use doesn't grow with the length of the history
+##
+## @PARAMS
+## 'ladderID' (int): ladder to walk
+## 'since' (datetime): stops at the first finished game that ended
+##     before this time (default: None, walks the whole history)
+## 'prefetch' (int): number of pages fetched ahead (default: 2)
+def iterGames(ladderID, since=None, prefetch=2):
+    pages = iterHistoryPages(ladderID, prefetch)
+    try:
+        for historyParser in pages:
+            for game in historyParser.getGameHistory():
+                endDate = game[5]
+                if (since is not None and endDate is not None and
+                    endDate < since):
+                    return
+                yield game
+    finally:
+        pages.close()
+
+# ladder history sync class
+## keeps ladder histories up to date without re-reading them in full
+## remembers, per ladder, the newest game ID already seen and the IDs of
+## games still in progress; a sync walks the history (newest first) only
+## until it is past the newest known game and every game in progress
+## has been looked at again
+## checkpoints are kept in a JSON file:
+## {ladder ID: {"newest": game ID, "pending": [game IDs]}}
+class LadderHistorySync(object):
+
+    ## constructor
+    ### takes the path of the checkpoint file (created on first save)
+    def __init__(self, path):
+        self.path = path
+        self.checkpoints = loadCheckpoints(path)
+
+    ## sync
+    ### fetches what changed on a ladder since its last sync and
+    ### updates (and saves) its checkpoint
+    ### returns a tuple (newGames, changedGames), each a list of game
+    ### tuples in the format returned by getGameHistory:
+    ### newGames holds games not seen before (every game on a first sync)
+    ### changedGames holds games that were in progress last time
+    ### and have since finished or expired
+    ### the walk only goes back as far as the oldest game still in
+    ### progress; one that is no longer where it was (it left the
+    ### history) is dropped from the checkpoint, so later syncs don't
+    ### walk back to it again
+    ###
+    ### @PARAMS
+    ### 'ladderID' (int): ladder to sync
+    ### 'prefetch' (int): history pages fetched ahead (default: 2)
+    def sync(self, ladderID, prefetch=2):
+        checkpoint = self.checkpoints.get(str(ladderID), dict())
+        newest = checkpoint.get("newest")
+        pending = set(checkpoint.get("pending", list()))
+        newGames, changedGames = list(), list()
+        newPending = set()
+        latest = newest
+        for game in iterGames(ladderID, prefetch=prefetch):
+            gameID, finished, expired = game[0], game[4], game[6]
+            known = (newest is not None and gameID <= newest)
+            if known and (len(pending) == 0 or gameID < min(pending)):
+                break
+            if not known:
+                newGames.append(game)
+                if latest is None or gameID > latest: latest = gameID
+            elif gameID in pending:
+                pending.discard(gameID)
+                if finished or expired:
+                    changedGames.append(game)
+            else: continue
+            if not finished and not expired:
+                newPending.add(gameID)
+        self.checkpoints[str(ladderID)] = {"newest": latest,
+                                           "pending": sorted(newPending)}
+        saveCheckpoints(self.path, self.checkpoints)
+        return newGames, changedGames
@@ -0,0 +1,490 @@
+# Imports
+
+## os - file handling for the on-disk cache
+import os
+
+## time - entry ages and access times
+import time
+
+## hashlib - turns URLs into file names
+import hashlib
+
+## threading - guards the cache's size bookkeeping
+import threading
+
+## io - reading and writing encoded text
+import io
+
+## tempfile - staging files for atomic writes
+import tempfile
+
+## sys - sizes of cached pages in memory
+import sys
+
+## collections - recency order of in-memory entries
+from collections import OrderedDict
+
+# Shared cache
+
+_cache = None
+
+## setCache
+### sets the page cache shared by every parser; None disables caching
+###
+### @PARAMS
+### 'cache' (DiskCache): cache to share
+def setCache(cache):
+    global _cache
+    _cache = cache
+
+## getCache
+### returns the shared page cache (None if caching is disabled)
+def getCache():
+    return _cache
+
+_memoryCache = None
+
+## setMemoryCache
+### sets the in-memory page cache shared by every parser (checked before
+### the disk cache); None disables it
+###
+### @PARAMS
+### 'memoryCache' (MemoryCache): cache to share
+def setMemoryCache(memoryCache):
+    global _memoryCache
+    _memoryCache = memoryCache
+
+## getMemoryCache
+### returns the shared in-memory page cache (None if it's disabled)
+def getMemoryCache():
+    return _memoryCache
+
+_validatorStore = None
+
+## setValidatorStore
+### sets the store of page validators shared by every parser, turning
+### on conditional requests; None turns them off
+###
+### @PARAMS
+### 'validatorStore' (ValidatorStore): store to share
+def setValidatorStore(validatorStore):
+    global _validatorStore
+    _validatorStore = validatorStore
+
+## getValidatorStore
+### returns the shared validator store (None if it's disabled)
+def getValidatorStore():
+    return _validatorStore
+
+# Disk cache class
+## stores page text on disk, one file per URL
+## an entry's modification time is when it was stored (used for TTLs)
+## and its access time is when it was last read (used for LRU eviction)
+class DiskCache(object):
+
+    ## constructor
+    ###
+    ### @PARAMS
+    ### 'path' (string): directory to keep cached pages in
+    ### 'maxBytes' (int): size cap; least recently used pages are evicted
+    ###     once the cache grows past it (default: 256 MB)
+    def __init__(self, path, maxBytes=256*1024*1024):
+        self.path = path
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.size = sum(entrySize for entryPath, entrySize, accessTime
+                        in self.getEntries())
+
+    ## getPath
+    ### returns the file path used to store a URL
+    def getPath(self, URL):
+        name = hashlib.sha1(URL.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, name + ".html")
+
+    ## getEntries
+    ### returns cached files as a list of tuples
+    ### (path (string), size (int), access time (float))
+    def getEntries(self):
+        entries = list()
+        for name in os.listdir(self.path):
+            if not name.endswith(".html"): continue
+            entryPath = os.path.join(self.path, name)
+            try:
+                stat = os.stat(entryPath)
+            except OSError:
+                continue
+            entries.append((entryPath, stat.st_size, stat.st_atime))
+        return entries
+
+    ## get
+    ### returns cached text for a URL, or None if there is no entry
+    ### or the entry is older than ttl seconds
+    ###
+    ### @PARAMS
+    ### 'URL' (string): page address
+    ### 'ttl' (float): maximum age of a usable entry, in seconds
+    ###     (None: entries never expire)
+    def get(self, URL, ttl=None):
+        entryPath = self.getPath(URL)
+        try:
+            storedTime = os.stat(entryPath).st_mtime
+            now = time.time()
+            if ttl is not None and now - storedTime > ttl:
+                return None
+            with io.open(entryPath, "rt", encoding="utf-8",
+                         newline="") as fin:
+                text = fin.read()
+            os.utime(entryPath, (now, storedTime))
+        except (IOError, OSError):
+            return None
+        return text
+
+    ## put
+    ### stores text for a URL, then evicts old entries if needed
+    ###
+    ### @PARAMS
+    ### 'URL' (string): page address
+    ### 'text' (string): page text
+    def put(self, URL, text):
+        entryPath = self.getPath(URL)
+        data = text.encode("utf-8")
+        handle, tempPath = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(handle, "wb") as fout:
+            fout.write(data)
+        with self.lock:
+            try:
+                self.size -= os.stat(entryPath).st_size
+            except OSError:
+                pass
+            if hasattr(os, "replace"):
+                os.replace(tempPath, entryPath)
+            else:
+                if os.path.exists(entryPath): os.remove(entryPath)
+                os.rename(tempPath, entryPath)
+            self.size += len(data)
+            if self.size > self.maxBytes:
+                self.evict()
+
+    ## evict
+    ### removes least recently used entries until the cache fits maxBytes
+    ### (called with the lock held)
+    def evict(self):
+        entries = sorted(self.getEntries(), key=lambda entry: entry[2])
+        self.size = sum(entry[1] for entry in entries)
+        for entryPath, entrySize, accessTime in entries:
+            if self.size <= self.maxBytes: break
+            try:
+                os.remove(entryPath)
+            except OSError:
+                continue
+            self.size -= entrySize
+
+    ## remove
+    ### drops the entry for a URL, if any
+    def remove(self, URL):
+        entryPath = self.getPath(URL)
+        with self.lock:
+            try:
+                entrySize = os.stat(entryPath).st_size
+                os.remove(entryPath)
+            except OSError:
+                return
+            self.size -= entrySize
+
+    ## clear
+    ### drops every entry
+    def clear(self):
+        with self.lock:
+            for entryPath, entrySize, accessTime in self.getEntries():
+                try:
+                    os.remove(entryPath)
+                except OSError:
+                    pass
+            self.size = 0
+
+# Memory cache class
+## keeps recently used pages in memory, shared by every thread of the
+## process, up to a byte budget; least recently used pages go first
+class MemoryCache(object):
+
+    ## constructor
+    ###
+    ### @PARAMS
+    ### 'maxBytes' (int): size cap, counting the memory held by the
+    ###     page strings (default: 64 MB)
+    def __init__(self, maxBytes=64*1024*1024):
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    ## get
+    ### returns cached text for a URL, or None if there is no entry
+    ### or the entry is older than ttl seconds
+    ###
+    ### @PARAMS
+    ### 'URL' (string): page address
+    ### 'ttl' (float): maximum age of a usable entry, in seconds
+    ###     (None: entries never expire)
+    def get(self, URL, ttl=None):
+        with self.lock:
+            entry = self.entries.get(URL)
+            if entry is not None:
+                text, storedTime, entrySize = entry
+                if ttl is None or time.time() - storedTime <= ttl:
+                    self.entries[URL] = self.entries.pop(URL)
+                    self.hits += 1
+                    return text
+            self.misses += 1
+            return None
+
+    ## put
+    ### stores text for a URL, then evicts old entries if needed
+    ### (pages larger than the whole budget aren't kept)
+    ###
+    ### @PARAMS
+    ### 'URL' (string): page address
+    ### 'text' (string): page text
+    def put(self, URL, text):
+        entrySize = sys.getsizeof(text)
+        with self.lock:
+            self.discard(URL)
+            if entrySize > self.maxBytes: return
+            self.entries[URL] = (text, time.time(), entrySize)
+            self.size += entrySize
+            while self.size > self.maxBytes:
+                oldURL = next(iter(self.entries))
+                self.discard(oldURL)
+
+    ## discard
+    ### drops the entry for a URL, if any (called with the lock held)
+    def discard(self, URL):
+        entry = self.entries.pop(URL, None)
+        if entry is not None: self.size -= entry[2]
+
+    ## remove
+    ### drops the entry for a URL, if any
+    def remove(self, URL):
+        with self.lock:
+            self.discard(URL)
+
+    ## clear
+    ### drops every entry
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    ## getStats
+    ### returns the cache's metrics as a dictionary
+    def getStats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "size": self.size,
+                    "hits": self.hits, "misses": self.misses}
+
+# Validator store class
+
+## StoredPage
+### what ValidatorStore remembers about a page
+class StoredPage(object):
+
+    __slots__ = ("pageData", "digest", "etag", "lastModified", "memo",
+                 "size")
+
+    def __init__(self, pageData, digest, etag, lastModified):
+        self.pageData = pageData
+        self.digest = digest
+        self.etag = etag
+        self.lastModified = lastModified
+        self.memo = dict()
+        self.size = sys.getsizeof(pageData)
+
+## ValidatorStore
+### remembers, per URL, the last page fetched, its validators (ETag and
+### Last-Modified headers), a hash of its text and the getter results
+### parsed from it, so that re-polling an unchanged page costs neither
+### a download (the server answers a conditional request with 304 Not
+### Modified) nor a parse (parsers get the stored page and results back)
+### counts pages served from the store: 'hits' (304 responses) and
+### 'skips' (full responses whose text hashed the same as before), along
+### with 'misses' (new or changed pages)
+### keeps up to maxEntries pages, and up to maxBytes of page text (as
+### MemoryCache counts it; memoized results are small, immutable values
+### and aren't counted); least recently used pages go first, and pages
+### larger than the whole budget aren't kept
+class ValidatorStore(object):
+
+    ## constructor
+    ###
+    ### @PARAMS
+    ### 'maxEntries' (int): number of pages kept (default: 10000)
+    ### 'maxBytes' (int): size cap, counting the memory held by the
+    ###     page strings (default: 64 MB)
+    def __init__(self, maxEntries=10000, maxBytes=64*1024*1024):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.skips = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    ## getHeaders
+    ### returns the conditional request headers for a URL, or None if
+    ### nothing is stored for it
+    def getHeaders(self, URL):
+        with self.lock:
+            entry = self.entries.get(URL)
+        if entry is None: return None
+        headers = dict()
+        if entry.etag is not None:
+            headers['If-None-Match'] = entry.etag
+        if entry.lastModified is not None:
+            headers['If-Modified-Since'] = entry.lastModified
+        return headers or None
+
+    ## update
+    ### records a response for a URL
+    ### returns the stored page text if the page hasn't changed (a 304
+    ### response, or the same text as before), the new text otherwise
+    ### (stored if the response is a 200), or None for a 304 response
+    ### with nothing stored to fall back on
+    ###
+    ### @PARAMS
+    ### 'URL' (string): page address
+    ### 'response': response returned by fetchPage
+    ### 'text' (string): decoded response text
+    def update(self, URL, response, text):
+        headers = getattr(response, 'headers', None) or dict()
+        if response.status_code == 304:
+            with self.lock:
+                entry = self.entries.get(URL)
+                if entry is None: return None
+                self.entries[URL] = self.entries.pop(URL)
+                self.hits += 1
+                return entry.pageData
+        if response.status_code != 200: return text
+        digest = hashlib.sha1(text.encode("utf-8")).digest()
+        etag = headers.get('ETag')
+        lastModified = headers.get('Last-Modified')
+        with self.lock:
+            entry = self.discard(URL)
+            if entry is not None and entry.digest == digest:
+                self.skips += 1
+                entry.etag, entry.lastModified = etag, lastModified
+            else:
+                self.misses += 1
+                entry = StoredPage(text, digest, etag, lastModified)
+            if entry.size > self.maxBytes: return entry.pageData
+            self.entries[URL] = entry
+            self.size += entry.size
+            while (len(self.entries) > self.maxEntries or
+                   self.size > self.maxBytes):
+                self.discard(next(iter(self.entries)))
+            return entry.pageData
+
+    ## discard
+    ### drops and returns the entry for a URL, if any (called with the
+    ### lock held)
+    def discard(self, URL):
+        entry = self.entries.pop(URL, None)
+        if entry is not None: self.size -= entry.size
+        return entry
+
+    ## getMemo
+    ### returns the getter results stored for a URL (a dictionary shared
+    ### with every parser holding the same page), or None if pageData
+    ### isn't the stored page
+    ###
+    ### @PARAMS
+    ### 'URL' (string): page address
+    ### 'pageData' (string): page text held by the parser
+    def getMemo(self, URL, pageData):
+        with self.lock:
+            entry = self.entries.get(URL)
+        if entry is None or entry.pageData is not pageData: return None
+        return entry.memo
+
+    ## remove
+    ### drops what is stored for a URL, if anything
+    def remove(self, URL):
+        with self.lock:
+            self.discard(URL)
+
+    ## clear
+    ### drops every entry
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    ## getStats
+    ### returns the store's counts as a dictionary
+    def getStats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "size": self.size,
+                    "hits": self.hits, "skips": self.skips,
+                    "misses": self.misses}
+
+# Single-flight fetching
+
+## Flight
+### a call in progress, as tracked by SingleFlight
+class Flight(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+## SingleFlight
+### coalesces concurrent calls with the same key: the first caller
+### runs the call, and callers arriving while it's in progress wait
+### for it and share its result (or its exception)
+class SingleFlight(object):
+
+    ## constructor
+    def __init__(self):
+        self.flights = dict()
+        self.shared = 0
+        self.lock = threading.Lock()
+
+    ## run
+    ### runs func() unless a call with the same key is in progress,
+    ### in which case that call's result is returned instead
+    ###
+    ### @PARAMS
+    ### 'key': identifies the call (e.g. a URL)
+    ### 'func' (function): call to make, taking no arguments
+    def run(self, key, func):
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = (flight is None)
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None: raise flight.error
+            return flight.result
+        try:
+            flight.result = func()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+## pageFlights
+### single-flight tracker for page fetches, keyed by URL and the
+### fetch settings (see WLParser.getData)
+pageFlights = SingleFlight()
@@ -1,7 +1,11 @@
 # Imports
 
-## requests - to make HTTP requests
-import requests
+## fetch_core - pooled HTTP sessions
+from fetch_core import fetchText, fetchHead, hasStopMarker
+
+## page_cache - in-memory and on-disk response caches
+from page_cache import (getCache, getMemoryCache, getValidatorStore,
+                        pageFlights)
 
 ## string - primarily for string constants
 import string
@@ -9,25 +13,219 @@ import string
 ## decimal - more precise mathematical operations
 from decimal import Decimal
 
+## io - reading archived pages from disk
+import io
+
 ## datetime - for handling date/time information
 import datetime
 
+## re - compiled character-class matchers for typed runs
+import re
+
+## zlib - compressed copies of released pages
+import zlib
+
+## json, os, tempfile - checkpoint files for incremental syncs
+import json
+import os
+import tempfile
+
 # Classless functions
 
 ## getPageData
 ### function decorator to ensure that
 ### object retrieves page data before
 ### performing an operation
+### (a page holding only the top of the page, see getHeadData, is
+### fetched again in full)
+### results are memoized per page: calling the getter again with the
+### same arguments returns the stored result instead of re-parsing,
+### until the page data is replaced (by getData or setData); stored
+### results stay available after releaseData, and are shared by parsers
+### given the same unchanged page by a validator store
+### only immutable results are stored (see isFrozen), and handed out
+### as they are; lists, sets and dictionaries of immutable values are
+### stored too, and handed out as shallow copies so callers can't alter
+### the stored result; anything holding other mutable objects is parsed
+### again on every call (getters returning big nested results should
+### use @noMemo, so they skip the bookkeeping altogether)
+### attributes a getter sets on the object (e.g. isEmpty) are stored
+### too, and set again on a hit; a getter setting a mutable attribute
+### isn't memoized
 ###
 ### @PARAMS
 ### 'func': class method to be called
 def getPageData(func):
-    def func_wrapper(self, *args):
-        if (not(hasattr(self, 'pageData'))):
-            self.getData()
-        return func(self, *args)
+    memoize = getattr(func, 'memoize', True)
+    def func_wrapper(self, *args, **kwargs):
+        return callGetter(self, func, memoize, ensurePage, args, kwargs)
     return func_wrapper
 
+## getHeadData
+### function decorator for getters that only need the top of the page:
+### if the object has no page data yet, only the part of the page up to
+### one of the stop markers is fetched (see WLParser.getHead)
+### getters using @getPageData fetch the full page when they need it
+###
+### @PARAMS
+### 'stopMarkers': markers to stop reading at (see fetch_core.readHead)
+def getHeadData(*stopMarkers):
+    def decorator(func):
+        memoize = getattr(func, 'memoize', True)
+        ensure = lambda obj: ensureHead(obj, stopMarkers)
+        def func_wrapper(self, *args, **kwargs):
+            return callGetter(self, func, memoize, ensure, args, kwargs)
+        return func_wrapper
+    return decorator
+
+## ensurePage
+### helper for getPageData: loads the full page if needed
+def ensurePage(obj):
+    if (not(hasattr(obj, 'pageData')) or
+        getattr(obj, 'pagePartial', False)):
+        obj.getData()
+
+## ensureHead
+### helper for getHeadData: loads the top of the page if needed
+### (objects without getHead load the full page); a partial page that
+### stops short of this getter's markers is fetched again in full
+def ensureHead(obj, stopMarkers):
+    if (not(hasattr(obj, 'pageData'))):
+        getHead = getattr(obj, 'getHead', None)
+        if getHead is None: obj.getData()
+        else: getHead(stopMarkers)
+    elif (getattr(obj, 'pagePartial', False) and
+          not hasStopMarker(obj.pageData, stopMarkers)):
+        obj.getData()
+
+## callGetter
+### helper for the page data decorators: makes sure the page is loaded
+### (using 'ensure'), then runs the getter, through the memo if
+### 'memoize' is set (see getPageData)
+def callGetter(obj, func, memoize, ensure, args, kwargs):
+    if not memoize:
+        ensure(obj)
+        return func(obj, *args, **kwargs)
+    key = (func, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError: # unhashable arguments: don't memoize
+        ensure(obj)
+        return func(obj, *args, **kwargs)
+    stored = getMemo(obj).get(key)
+    if stored is None:
+        ensure(obj)
+        stored = getMemo(obj).get(key)
+    if stored is None:
+        before = dict(obj.__dict__)
+        value = func(obj, *args, **kwargs)
+        skipped = getattr(obj, 'pageState', ()) + memoState
+        changes = dict((name, attr) for name, attr in obj.__dict__.items()
+                       if name not in skipped and
+                       (name not in before or before[name] is not attr))
+        if isFrozen(value):
+            shared = False
+        elif (isinstance(value, (list, set, dict)) and
+              all(isFrozen(item) for item in value) and
+              (not isinstance(value, dict) or
+               all(isFrozen(item) for item in value.values()))):
+            shared = True
+        else:
+            return value
+        if not all(isFrozen(attr) for attr in changes.values()):
+            return value
+        getMemo(obj)[key] = (value, changes, shared)
+    else:
+        value, changes, shared = stored
+        for name in changes:
+            setattr(obj, name, changes[name])
+    if shared: return type(value)(value)
+    return value
+
+## frozenTypes
+### types isFrozen accepts as immutable
+frozenTypes = (type(None), bool, int, type(2 ** 64), float, type(""),
+               type(u""), Decimal, datetime.date, datetime.time,
+               datetime.timedelta)
+
+## isFrozen
+### helper for callGetter: returns True if a value can't be altered
+### (a string, number, date, ... or a tuple or frozenset of those), so
+### it can be memoized and handed out without copying
+###
+### @PARAMS
+### 'value': value to check
+def isFrozen(value):
+    if isinstance(value, frozenTypes): return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(isFrozen(item) for item in value)
+    return False
+
+## noMemo
+### function decorator that opts a getter out of getPageData's
+### memoization (for getters that keep their own cache, or return
+### mutable objects built fresh per call); goes below @getPageData
+### (or @getHeadData)
+###
+### @PARAMS
+### 'func': class method to be called
+def noMemo(func):
+    func.memoize = False
+    return func
+
+## memoState
+### attributes never recorded as a getter's changes (see callGetter)
+memoState = ("pageData", "pageZip", "pagePartial", "memoData",
+             "memoSource")
+
+## getMemo
+### returns an object's memo of getter results for its current page
+### data, starting a new one if the page data has been replaced
+### without page data, returns the memo of the released page (see
+### WLParser.releaseData), or an empty dictionary
+###
+### @PARAMS
+### 'obj': object holding page data
+def getMemo(obj):
+    pageData = getattr(obj, 'pageData', None)
+    if pageData is None:
+        if getattr(obj, 'memoSource', None) is None:
+            return getattr(obj, 'memoData', dict())
+        return dict()
+    if getattr(obj, 'memoSource', None) is not pageData:
+        obj.memoData = dict()
+        obj.memoSource = pageData
+    return obj.memoData
+
+## loadCheckpoints
+### returns the dictionary stored in a JSON checkpoint file
+### (an empty dictionary if the file doesn't exist yet)
+###
+### @PARAMS
+### 'path' (string): checkpoint file path
+def loadCheckpoints(path):
+    if not os.path.exists(path): return dict()
+    with open(path, "r") as fin:
+        return json.load(fin)
+
+## saveCheckpoints
+### writes a dictionary to a JSON checkpoint file, atomically, so an
+### interrupted sync never leaves a truncated file behind
+###
+### @PARAMS
+### 'path' (string): checkpoint file path
+### 'checkpoints' (dict): data to store
+def saveCheckpoints(path, checkpoints):
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tempPath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(handle, "w") as fout:
+        json.dump(checkpoints, fout, sort_keys=True)
+    if hasattr(os, "replace"):
+        os.replace(tempPath, path)
+    else:
+        if os.path.exists(path): os.remove(path)
+        os.rename(tempPath, path)
+
 # Error classes
 
 ## ContentError
@@ -36,10 +234,264 @@ def getPageData(func):
 class ContentError(Exception):
     pass
 
+# Scanner class
+## walks a text field with a position cursor, so markers are found
+## from where the previous field ended and values are sliced out once,
+## without copying the remainder of the text along the way
+class Scanner(object):
+
+    ## typeMatchers
+    ### compiled matchers for typeRange strings, shared by all scanners
+    typeMatchers = dict()
+
+    ## constructor
+    ### takes a text field and an optional starting position
+    def __init__(self, text, pos=0):
+        self.text = text
+        self.pos = pos
+
+    ## getTypeMatcher
+    ### returns a compiled regex matching a (possibly empty) run of
+    ### characters that all fall within typeRange
+    @classmethod
+    def getTypeMatcher(cls, typeRange):
+        matcher = cls.typeMatchers.get(typeRange)
+        if matcher is None:
+            matcher = re.compile("[" + re.escape(typeRange) + "]*")
+            cls.typeMatchers[typeRange] = matcher
+        return matcher
+
+    ## find
+    ### returns the start offset of the next occurrence of a marker
+    ### at or after the cursor, or -1 if there is none
+    ### (doesn't move the cursor)
+    def find(self, marker):
+        return self.text.find(marker, self.pos)
+
+    ## skipTo
+    ### moves the cursor past the next occurrence of a marker
+    ### and returns the marker's start offset
+    ### raises a ContentError if the marker doesn't occur
+    def skipTo(self, marker):
+        loc = self.text.find(marker, self.pos)
+        if loc == -1:
+            raise ContentError("Missing marker: " + marker)
+        self.pos = loc + len(marker)
+        return loc
+
+    ## readTyped
+    ### reads the run of characters within typeRange at the cursor
+    ### and moves the cursor past it
+    ###
+    ### @PARAMS
+    ### 'typeRange' (string): all members of the acceptable type
+    def readTyped(self, typeRange):
+        match = self.getTypeMatcher(typeRange).match(self.text, self.pos)
+        self.pos = match.end()
+        return match.group()
+
+    ## readUntil
+    ### reads text from the cursor up to the next occurrence of an end
+    ### marker and moves the cursor to the start of that marker
+    ### raises a ContentError if the end marker doesn't occur
+    def readUntil(self, end):
+        loc = self.text.find(end, self.pos)
+        if loc == -1:
+            raise ContentError("Missing marker: " + end)
+        value = self.text[self.pos:loc]
+        self.pos = loc
+        return value
+
+    ## readBetween
+    ### reads the value between the next 'before' marker and the
+    ### 'after' marker following it, leaving the cursor on 'after'
+    def readBetween(self, before, after):
+        self.skipTo(before)
+        return self.readUntil(after)
+
+    ## readRest
+    ### reads everything from the cursor to the end of the text
+    def readRest(self):
+        value = self.text[self.pos:]
+        self.pos = len(self.text)
+        return value
+
+# Extraction schema class
+## describes a page type's simple fields as tuples
+## (name, marker, end, valueType) or (name, marker, end, valueType, default)
+## and pulls all of them out of a page in a single scan
+##
+## valueType is either
+## - "text": the text between marker and end
+## - a key of valueTypes: the run of characters within that type's range
+##   directly after marker (end is ignored), converted by its converter
+## - a callable: applied to the text between marker and end
+## if a field has a default, it is returned when marker isn't on the page
+##
+## the markers are compiled into one regex (longest first, so a marker
+## that starts where a longer one matched is found through the longer
+## marker's prefix list); scanning resumes one character past each match,
+## so overlapping markers are all found, and stops once every field is set
+class ExtractionSchema(object):
+
+    ## valueTypes
+    ### typed runs: name -> (typeRange, converter)
+    valueTypes = {
+        "integer": (string.digits + "-+", int),
+        "numeric": (string.digits + ".+-", float),
+        "letters": (string.ascii_lowercase + string.ascii_uppercase, str),
+        "grouped": (string.digits + ",",
+                    lambda value: int(value.replace(",", ""))),
+    }
+
+    ## constructor
+    ### takes a list of field specs (see above)
+    def __init__(self, fields):
+        self.fields = dict()
+        self.names = list()
+        for field in fields:
+            name = field[0]
+            self.fields[name] = field
+            self.names.append(name)
+        self.compiled = dict()
+
+    ## compile
+    ### builds (and caches) the matcher for a set of field names
+    ### returns a tuple (regex, markers, fieldsByMarker, prefixes)
+    def compile(self, names):
+        key = frozenset(names)
+        compiled = self.compiled.get(key)
+        if compiled is not None: return compiled
+        fieldsByMarker = dict()
+        for name in names:
+            marker = self.fields[name][1]
+            fieldsByMarker.setdefault(marker, list()).append(name)
+        markers = sorted(fieldsByMarker, key=len, reverse=True)
+        regex = re.compile("|".join("(" + re.escape(marker) + ")"
+                                    for marker in markers))
+        prefixes = [[other for other in markers[i+1:]
+                     if marker.startswith(other)]
+                    for i, marker in enumerate(markers)]
+        compiled = (regex, markers, fieldsByMarker, prefixes)
+        self.compiled[key] = compiled
+        return compiled
+
+    ## readField
+    ### reads one field's value starting right after its marker
+    ### raises a ContentError if the value can't be read
+    def readField(self, text, name, pos):
+        marker, end, valueType = self.fields[name][1:4]
+        scanner = Scanner(text, pos)
+        if valueType in self.valueTypes:
+            typeRange, converter = self.valueTypes[valueType]
+            value = scanner.readTyped(typeRange)
+            if len(value) == 0:
+                raise ContentError("No content in specified range!")
+            return converter(value)
+        value = scanner.readUntil(end)
+        if valueType == "text": return value
+        return valueType(value)
+
+    ## extract
+    ### scans a page once and returns a tuple (values, errors) of
+    ### dictionaries keyed by field name; a field lands in errors (as a
+    ### message) if its marker is missing and it has no default, or if
+    ### its value can't be read (any exception raised while reading or
+    ### converting it)
+    ###
+    ### @PARAMS
+    ### 'text' (string): page to extract from
+    ### 'names' (list): fields to extract (default: all fields)
+    def extract(self, text, names=None):
+        if names is None: names = self.names
+        regex, markers, fieldsByMarker, prefixes = self.compile(names)
+        values, errors = dict(), dict()
+        remaining = set(markers)
+        pos = 0
+        while (len(remaining) > 0):
+            match = regex.search(text, pos)
+            if match is None: break
+            index = match.lastindex - 1
+            for marker in [markers[index]] + prefixes[index]:
+                if marker not in remaining: continue
+                remaining.discard(marker)
+                markerEnd = match.start() + len(marker)
+                for name in fieldsByMarker[marker]:
+                    try:
+                        values[name] = self.readField(text, name,
+                                                      markerEnd)
+                    except Exception as error:
+                        errors[name] = str(error)
+            pos = match.start() + 1
+        for marker in remaining:
+            for name in fieldsByMarker[marker]:
+                field = self.fields[name]
+                if len(field) > 4:
+                    values[name] = field[4]
+                else:
+                    errors[name] = "Missing marker: " + marker
+        return values, errors
+
 # Main parser class
 
 class WLParser(object):
 
+    ## session
+    ### session used by getData; None uses the shared pooled session
+    ### (assign a session to an instance to override it)
+    session = None
+
+    ## cache
+    ### page cache used by getData; None uses the shared cache
+    ### from page_cache (if one has been set with setCache)
+    cache = None
+
+    ## cacheTTL
+    ### seconds a cached copy of this type of page stays usable
+    ### (subclasses override it to suit how often their pages change)
+    cacheTTL = 3600
+
+    ## encoding
+    ### encoding used to decode fetched pages; None lets requests
+    ### work it out (slow on large pages served without a charset)
+    ### Warlight serves UTF-8, so "utf-8" is safe to set here
+    encoding = None
+
+    ## errorMarker
+    ### marker on the site's error page; pages holding it are retried
+    errorMarker = '<h1>Whoops, an error has occurred</h1>'
+
+    ## schema
+    ### ExtractionSchema describing the page type's simple fields
+    ### (None for page types that don't declare one)
+    schema = None
+
+    ## streamHead
+    ### if True, getters that only need the top of the page stop
+    ### downloading once they have it (see getHead); set to False if
+    ### most callers go on to read the rest of the page anyway
+    streamHead = True
+
+    ## pagePartial
+    ### True while the page data holds only the top of the page
+    pagePartial = False
+
+    ## pageZip
+    ### zlib-compressed page data kept by releaseData (None if there's
+    ### no compressed copy)
+    pageZip = None
+
+    ## pageCaches
+    ### attributes holding data derived from the current page, dropped
+    ### along with it by releaseData; subclasses add their own
+    pageCaches = ("fieldData", "fieldSource")
+
+    ## pageState
+    ### attributes tied to the current page (or connection) that are
+    ### left out when a parser is pickled; subclasses add their own
+    ### pageCaches here too
+    pageState = memoState + pageCaches + ("session", "cache")
+
     ## constructor
     ### takes in a baseURL (defaults to warlight.net)
     ### and creates URL querystring with specific
@@ -50,6 +502,15 @@ class WLParser(object):
             self.baseURL = baseURL
         self.URL = self.makeURL(**kwargs)
 
+    ## __getstate__
+    ### pickles a parser without its page data, so parsers can be sent
+    ### to other processes cheaply (page data can be sent separately)
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self.pageState:
+            state.pop(name, None)
+        return state
+
     ## makeURL
     ### helper function for constructor
     ### generates URL querystring based on
@@ -67,20 +528,243 @@ class WLParser(object):
 
     ## getData
     ### retrieves page data through an HTTP GET request
-    ### optionally loops until the request completes
+    ### (made through the pooled session from fetch_core, within the
+    ### shared rate limit)
+    ### failed requests and error pages are retried with backoff,
+    ### up to the shared retry cap
+    ### pages younger than cacheTTL are read from the page caches
+    ### (memory first, then disk) instead, and freshly fetched pages
+    ### are stored in them; a page released with compression
+    ### (see releaseData) is decompressed instead
+    ### concurrent calls for the same URL, from any thread or parser,
+    ### share a single request, as long as they also agree on loop,
+    ### useCache, session and encoding
+    ### with a validator store set (see page_cache.ValidatorStore), the
+    ### request is made conditional, and a page that hasn't changed comes
+    ### back with the getter results parsed from it last time
+    ###
+    ### @PARAMS
+    ### 'loop' (string): whether to retry until request succeeds
+    ### or the retry cap is reached (default: True)
+    ### 'useCache' (bool): if False, skips the cache lookup and always
+    ### fetches (the fresh page is still stored) (default: True)
+    def getData(self, loop=True, useCache=True):
+        if useCache and not self.pagePartial and self.restoreData(): return
+        if self.pageZip is not None: self.pageZip = None
+        pageData = None
+        if useCache: pageData = self.readCache()
+        if pageData is None:
+            flightKey = (self.URL, loop, useCache, self.session,
+                         self.encoding)
+            pageData = pageFlights.run(flightKey,
+                                       lambda: self.fetchData(loop,
+                                                              useCache))
+        self.pageData = pageData
+        if self.pagePartial: self.pagePartial = False
+        validatorStore = getValidatorStore()
+        if validatorStore is not None:
+            memo = validatorStore.getMemo(self.URL, pageData)
+            if memo is not None:
+                self.memoData, self.memoSource = memo, pageData
+
+    ## getHead
+    ### retrieves the top of the page: the response is streamed and
+    ### reading stops once one of the stop markers has been seen (see
+    ### fetch_core.readHead), so the rest is never downloaded or decoded
+    ### a page already in the caches (or compressed by releaseData) is
+    ### used as is; a partial page is never stored in the caches
+    ### sets pagePartial if only part of the page was read
     ###
     ### @PARAMS
-    ### 'loop' (string): whether to loop until request succeeds
-    ### (default: True)
-    def getData(self, loop=True):
-        stop = False
-        while (not stop):
-            try:
-                r = requests.get(self.URL)
-                stop = True
-            except:
-                if (not loop): stop = True
-        self.pageData = r.text
+    ### 'stopMarkers' (list): markers to stop reading at
+    ### 'loop' (bool): see getData (default: True)
+    def getHead(self, stopMarkers, loop=True):
+        if not self.streamHead:
+            return self.getData(loop)
+        if self.restoreData(): return
+        pageData = self.readCache()
+        if pageData is not None:
+            self.pageData = pageData
+            return
+        r, pageData, failed, complete = fetchHead(self.URL, stopMarkers,
+                                                  self.session,
+                                                  self.encoding,
+                                                  self.errorMarker, loop)
+        self.pageData = pageData
+        self.pagePartial = not complete
+        if complete and not failed and r.status_code == 200:
+            self.storeCache(pageData)
+
+    ## readCache
+    ### returns the parser's page from the memory or disk cache,
+    ### or None if neither holds a copy younger than cacheTTL
+    def readCache(self):
+        memoryCache = getMemoryCache()
+        if memoryCache is not None:
+            pageData = memoryCache.get(self.URL, self.cacheTTL)
+            if pageData is not None: return pageData
+        cache = self.cache
+        if cache is None: cache = getCache()
+        if cache is None: return None
+        return cache.get(self.URL, self.cacheTTL)
+
+    ## fetchData
+    ### helper for getData: fetches the parser's page (conditionally,
+    ### with a validator store set) and stores it in the caches;
+    ### returns the page text
+    ### (with useCache, the memory cache is checked again first, in case
+    ### another fetch stored the page in the meantime)
+    def fetchData(self, loop=True, useCache=True):
+        memoryCache = getMemoryCache()
+        if useCache and memoryCache is not None:
+            pageData = memoryCache.get(self.URL, self.cacheTTL)
+            if pageData is not None: return pageData
+        validatorStore = getValidatorStore()
+        headers = None
+        if validatorStore is not None:
+            headers = validatorStore.getHeaders(self.URL)
+        r, pageData, failed = fetchText(self.URL, self.session,
+                                        self.encoding, self.errorMarker,
+                                        loop, headers)
+        fresh = (not failed and r.status_code == 200)
+        if validatorStore is not None and not failed:
+            storedData = validatorStore.update(self.URL, r, pageData)
+            if storedData is None: # 304, but the stored page is gone
+                r, pageData, failed = fetchText(self.URL, self.session,
+                                                self.encoding,
+                                                self.errorMarker, loop)
+                fresh = (not failed and r.status_code == 200)
+                if fresh:
+                    storedData = validatorStore.update(self.URL, r, pageData)
+            if storedData is not None:
+                if r.status_code == 304: fresh = True
+                pageData = storedData
+        if fresh: self.storeCache(pageData)
+        return pageData
+
+    ## storeCache
+    ### stores freshly fetched page data in the memory and disk caches
+    def storeCache(self, pageData):
+        memoryCache = getMemoryCache()
+        if memoryCache is not None: memoryCache.put(self.URL, pageData)
+        cache = self.cache
+        if cache is None: cache = getCache()
+        if cache is not None: cache.put(self.URL, pageData)
+
+    ## setData
+    ### attaches page data directly (e.g. a page saved earlier),
+    ### so getters run without an HTTP request
+    ### returns the parser, so calls can be chained
+    ###
+    ### @PARAMS
+    ### 'pageData' (string): page HTML
+    def setData(self, pageData):
+        self.pageData = pageData
+        if self.pageZip is not None: self.pageZip = None
+        if self.pagePartial: self.pagePartial = False
+        return self
+
+    ## releaseData
+    ### frees the memory held by the page once the fields needed from it
+    ### have been extracted: runs the given getters (their results stay
+    ### memoized, see getPageData), then drops the page data or keeps a
+    ### zlib-compressed copy of it; getters that need the page again
+    ### decompress that copy, or fetch the page again if it was dropped
+    ### returns the parser, so calls can be chained
+    ###
+    ### @PARAMS
+    ### 'compress' (bool): keep a compressed copy (default: True)
+    ### 'getters' (iterable): names of getters to run first
+    ###     (default: none)
+    def releaseData(self, compress=True, getters=()):
+        for getter in getters:
+            getattr(self, getter)()
+        if not hasattr(self, 'pageData'): return self
+        getMemo(self)
+        if compress:
+            self.pageZip = zlib.compress(self.pageData.encode("utf-8"))
+        elif self.pageZip is not None:
+            self.pageZip = None
+        for name in ("pageData",) + self.pageCaches:
+            self.__dict__.pop(name, None)
+        self.memoSource = None
+        return self
+
+    ## restoreData
+    ### helper for getData: brings back page data released with
+    ### compression, along with its memoized results
+    ### returns False if there's no compressed copy to restore
+    def restoreData(self):
+        if self.pageZip is None: return False
+        pageData = zlib.decompress(self.pageZip).decode("utf-8")
+        self.pageData = pageData
+        if hasattr(self, 'memoData'): self.memoSource = pageData
+        self.pageZip = None
+        return True
+
+    ## loadFile
+    ### attaches page data read from a saved HTML file
+    ### returns the parser, so calls can be chained
+    ###
+    ### @PARAMS
+    ### 'path' (string): path of the saved page
+    ### 'encoding' (string): encoding of the file (default: utf-8)
+    def loadFile(self, path, encoding="utf-8"):
+        with io.open(path, "rt", encoding=encoding, newline="") as fin:
+            return self.setData(fin.read())
+
+    ## loadMmap
+    ### attaches page data from a region of a memory-mapped archive
+    ### (or any buffer of bytes); only the region itself is decoded
+    ### returns the parser, so calls can be chained
+    ###
+    ### @PARAMS
+    ### 'region' (mmap or bytes): buffer holding the page
+    ### 'start' (int): offset of the page in the buffer (default: 0)
+    ### 'end' (int): offset just past the page (default: end of buffer)
+    ### 'encoding' (string): encoding of the page (default: utf-8)
+    def loadMmap(self, region, start=0, end=None, encoding="utf-8"):
+        if end is None: end = len(region)
+        return self.setData(region[start:end].decode(encoding))
+
+    ## getFields
+    ### returns a tuple (values, errors) holding every field in the
+    ### page type's schema, extracted in one scan of the page and
+    ### reused until the page data changes
+    @getPageData
+    @noMemo
+    def getFields(self):
+        if getattr(self, 'fieldSource', None) is not self.pageData:
+            self.fieldData = self.schema.extract(self.pageData)
+            self.fieldSource = self.pageData
+        return self.fieldData
+
+    ## getField
+    ### returns the value of a single schema field
+    ### raises a ContentError if the field couldn't be extracted
+    ###
+    ### @PARAMS
+    ### 'name' (string): field name from the schema
+    def getField(self, name):
+        values, errors = self.getFields()
+        if name in errors:
+            raise ContentError(errors[name])
+        return values[name]
+
+    ## getHeadField
+    ### getField for getters using @getHeadData: while the parser holds
+    ### only the top of the page, reads the field from that instead of
+    ### fetching the full page
+    ### raises a ContentError if the field couldn't be extracted
+    ###
+    ### @PARAMS
+    ### 'name' (string): field name from the schema
+    def getHeadField(self, name):
+        if not self.pagePartial: return self.getField(name)
+        values, errors = self.schema.extract(self.pageData, [name])
+        if name in errors:
+            raise ContentError(errors[name])
+        return values[name]
 
     ## getValueFromBetween
     ### gets a value in a text field situated between
@@ -94,18 +778,21 @@ class WLParser(object):
     def getValueFromBetween(text, before, after):
         if before is None: before = ""
         if after is None: after = ""
-        if (before not in text):
+        scanner = Scanner(text)
+        beforeLoc = scanner.find(before)
+        if (beforeLoc == -1):
             raise ContentError("Missing 'before' marker: " + before +
                                " in " + text)
-        if (after not in text):
-            raise ContentError("Missing 'after' marker! " + after +
-                               " in " + text)
-        beforeLoc = text.find(before) + len(before)
-        value = text[beforeLoc:]
-        if (after == ""): return value
-        afterLoc = value.find(after)
-        value = value[:afterLoc]
-        return value
+        scanner.pos = beforeLoc + len(before)
+        if (after == ""): return scanner.readRest()
+        afterLoc = scanner.find(after)
+        if (afterLoc == -1):
+            if (after not in text):
+                raise ContentError("Missing 'after' marker! " + after +
+                                   " in " + text)
+            # 'after' only occurs before 'before'; kept as it always was
+            return text[scanner.pos:-1]
+        return text[scanner.pos:afterLoc]
 
     ## getTypedValue
     ### given a known marker and a string containing all values
@@ -123,15 +810,13 @@ class WLParser(object):
     ###     if there is no content in the desired range of the specified type
     @staticmethod
     def getTypedValue(text, marker, typeRange, check=True):
-        if marker not in text:
+        scanner = Scanner(text)
+        loc = scanner.find(marker)
+        if (loc == -1):
             raise ContentError("Missing marker: " + marker + " in " +
                                text)
-        loc = text.find(marker) + len(marker)
-        text = text[loc:]
-        data = ""
-        while (len(text) > 0 and text[0] in typeRange):
-            data += text[0]
-            text = text[1:]
+        scanner.pos = loc + len(marker)
+        data = scanner.readTyped(typeRange)
         if (check and (len(data) == 0)):
             raise ContentError("No content in specified range!")
         return data
@@ -237,8 +922,4 @@ class WLParser(object):
     ### removes leading and ending spaces in a string
     @staticmethod
     def trimString(string):
-        while (string[0] == " " or string[0] == "\n"):
-            string = string[1:]
-        while (string[-1] == " " or string[-1] == "\n"):
-            string = string[:-1]
-        return string
\ No newline at end of file
+        return string.strip(" \n")
@@ -5,6 +5,85 @@ from parser_core import *
 # main player parser class
 class PlayerParser(WLParser):
 
+    ## pageCaches, pageState
+    ### the section index (see getSections) is tied to the page too
+    pageCaches = WLParser.pageCaches + ("sectionData", "sectionSource")
+    pageState = WLParser.pageState + ("sectionData", "sectionSource")
+
+    ## schema
+    ### simple fields on a profile page, extracted together by getFields
+    schema = ExtractionSchema([
+        ("playerName", "<title>", " -", "text"),
+        ("clanID", '<a href="/Clans/?ID=', None, "integer", None),
+        ("clanIcon", '"vertical-align: middle" src="', '" border="',
+         "text", None),
+        ("location", 'title="Plays from ', '"', "text", ""),
+        ("level", "<big><b>Level ", None, "integer"),
+        ("points", "days:</font> ", None, "grouped"),
+        ("email", "E-mail:</font> ", "<br />", "text"),
+        ("tagline", "Tagline:</font> ", "<br />", "text"),
+        ("bio", "Bio:</font>  ", "<br />", "text"),
+        ("joinString", "Joined WarLight:</font> ", "<br />", "text"),
+        ("memberString", "Member since</font> ", "</font>", "text", ""),
+        ("playedGames", "Played in</font> ", None, "integer"),
+        ("playedRange", "Played in", "<br />", "text"),
+        ("currentGamesRange", "Currently in</font> ", "games", "text"),
+        ("lastSeenString", "Last seen </font>", "<font", "text"),
+        ("notFound", "Sorry, the requested player was not found.", "",
+         "text", None),
+        ("clanNameRange", '<a href="/Clans/?ID=', "/a>", "text", None),
+        ("memberIcon", 'id="MemberIcon" title="WarLight Member"', "",
+         "text", None),
+        ("linkRange", "Player-supplied link:", "</a>", "text"),
+        ("neverBooted", "never been booted", "", "text", None),
+        ("bootRange", "This player has been booted ", "</font>", "text",
+         None),
+        ("favoriteMapsRange", "Favorite Maps</h3", "</td", "text", None),
+        ("achievementRange", "<h3>Achievements", "</font>", "text", None),
+    ])
+
+    ## profileSchemaFields
+    ### getProfile fields read straight from a schema field
+    profileSchemaFields = ("playerName", "clanID", "clanIcon", "location",
+                           "level", "points", "email", "tagline", "bio",
+                           "joinString", "memberString", "playedGames",
+                           "lastSeenString")
+
+    ## profileDerivedFields
+    ### getProfile fields converted from schema fields:
+    ### field name -> (schema field, converter method name), or
+    ### field name -> ((schema fields), converter method name) for
+    ### converters taking several fields
+    profileDerivedFields = {
+        "exists": ("notFound", "convertExists"),
+        "clanName": ("clanNameRange", "convertClanName"),
+        "memberStatus": ("memberIcon", "convertMemberStatus"),
+        "link": ("linkRange", "convertLink"),
+        "joinDate": ("joinString", "getDate"),
+        "memberDate": ("memberString", "convertMemberDate"),
+        "currentGames": ("currentGamesRange", "convertCurrentGames"),
+        "percentRT": ("playedRange", "convertPercentRT"),
+        "lastSeen": ("lastSeenString", "convertLastSeen"),
+        "bootCount": (("neverBooted", "bootRange"), "convertBootCount"),
+        "bootRate": (("neverBooted", "bootRange"), "convertBootRate"),
+        "favoriteMaps": ("favoriteMapsRange", "convertFavoriteMaps"),
+        "achievementRate": ("achievementRange", "convertAchievementRate"),
+    }
+
+    ## profileGetters
+    ### getProfile fields read from their own section of the page, found
+    ### through the section index (see getSections):
+    ### field name -> getter method name
+    profileGetters = {
+        "singleStats": "getSingleStats",
+        "favoriteGames": "getFavoriteGames",
+        "tournaments": "getTournaments",
+        "ladderData": "getLadderData",
+        "rankedData": "getRankedData",
+        "previousNames": "getPreviousNames",
+        "playSpeed": "getPlaySpeed",
+    }
+
     ## constructor
     ### takes a player ID
     def __init__(self, playerID):
@@ -14,141 +93,134 @@ class PlayerParser(WLParser):
 
     ## playerExists
     ### returns a boolean determining whether a player exists
-    @getPageData
+    ### (only the top of the page is fetched, if the page isn't loaded:
+    ### up to the error message, or to the player's level if there is
+    ### no error)
+    @getHeadData("Sorry, the requested player was not found.",
+                 "<big><b>Level ")
     def playerExists(self):
         page = self.pageData
         marker = "Sorry, the requested player was not found."
         return (marker not in page)
 
+    ## convertExists
+    ### helper for getProfile; a player exists unless the not-found
+    ### message was extracted
+    @staticmethod
+    def convertExists(notFound):
+        return (notFound is None)
+
     ## getClanID
     ### returns ID number for player's clan
     @getPageData
     def getClanID(self):
-        page = self.pageData
-        marker = '<a href="/Clans/?ID='
-        if marker not in page: return None
-        return self.getIntegerValue(page, marker)
+        return self.getField("clanID")
 
     ## getClanIcon
     ### returns URL string for clan icon
     @getPageData
     def getClanIcon(self):
-        page = self.pageData
-        marker = '"vertical-align: middle" src="'
-        end = '" border="'
-        if marker not in page: return None
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("clanIcon")
 
     ## getLocation
     ### returns location string for a player
     ### either a country name or "United States: [state name]"
     @getPageData
     def getLocation(self):
-        page = self.pageData
-        marker = 'title="Plays from '
-        end = '"'
-        if marker not in page: return ""
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("location")
 
     ## getClanName
     ### returns name (string) of player's clan
     @getPageData
     def getClanName(self):
-        page = self.pageData
-        outerMarker = '<a href="/Clans/?ID='
-        if outerMarker not in page: return ""
-        outerEnd = '/a>'
-        clanNameArea = self.getValueFromBetween(page, outerMarker, outerEnd)
+        return self.convertClanName(self.getField("clanNameRange"))
+
+    ## convertClanName
+    ### helper for getClanName; reads the clan name from the clan link
+    ### ("" if there's no clan)
+    @classmethod
+    def convertClanName(cls, clanNameArea):
+        if clanNameArea is None: return ""
         innerMarker = 'border="0" />'
         innerEnd = '<'
         if innerMarker in clanNameArea:
-            return self.trimString(self.getValueFromBetween(clanNameArea,
-                                                            innerMarker,
-                                                            innerEnd))
+            return cls.trimString(cls.getValueFromBetween(clanNameArea,
+                                                          innerMarker,
+                                                          innerEnd))
         else:
             otherMarker = '">'
             otherEnd = '<'
-            return self.trimString(self.getValueFromBetween(clanNameArea,
-                                                            otherMarker,
-                                                            otherEnd))
+            return cls.trimString(cls.getValueFromBetween(clanNameArea,
+                                                          otherMarker,
+                                                          otherEnd))
 
     ## getPlayerName
     ### gets player's name
-    @getPageData
+    ### (only the top of the page is fetched, if the page isn't loaded)
+    @getHeadData(("<title>", " -"))
     def getPlayerName(self):
-        page = self.pageData
-        return self.getValueFromBetween(page, '<title>', ' -')
+        return self.getHeadField("playerName")
 
     ## getMemberStatus
     ### returns boolean (True if user is a Member)
     @getPageData
     def getMemberStatus(self):
-        page = self.pageData
-        memberString = 'id="MemberIcon" title="WarLight Member"'
-        return (memberString in page)
+        return self.convertMemberStatus(self.getField("memberIcon"))
+
+    ## convertMemberStatus
+    ### helper for getMemberStatus; True if the member icon was found
+    @staticmethod
+    def convertMemberStatus(memberIcon):
+        return (memberIcon is not None)
 
     ## getLevel
     ### returns player's level
     @getPageData
     def getLevel(self):
-        page = self.pageData
-        return self.getIntegerValue(page, '<big><b>Level ')
+        return self.getField("level")
 
     ## getPoints
     ### returns points earned in last 30 days (int)
     @getPageData
     def getPoints(self):
-        page = self.pageData
-        points = self.getTypedValue(page, 'days:</font> ',
-                                    (string.digits + ","))
-        return int(points.replace(",",""))
+        return self.getField("points")
 
     ## getEmail
     ### returns player (partial) e-mail as a string
     @getPageData
     def getEmail(self):
-        page = self.pageData
-        marker = "E-mail:</font> "
-        end = "<br />"
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("email")
 
     ## getLink
     ### returns player-supplied link as a string
     @getPageData
     def getLink(self):
-        page = self.pageData
-        marker = "Player-supplied link:"
-        end = "</a>"
-        dataRange = self.getValueFromBetween(page, marker, end)
-        return self.getValueFromBetween(dataRange, '">', None)
+        return self.convertLink(self.getField("linkRange"))
+
+    ## convertLink
+    ### helper for getLink; reads the link text from its range
+    @classmethod
+    def convertLink(cls, dataRange):
+        return cls.getValueFromBetween(dataRange, '">', None)
 
     ## getTagline
     ### returns player tagline as a string
     @getPageData
     def getTagline(self):
-        page = self.pageData
-        marker = "Tagline:</font> "
-        end = "<br />"
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("tagline")
 
     ## getBio
     ### returns player bio as a string
     @getPageData
     def getBio(self):
-        page = self.pageData
-        marker = "Bio:</font>  "
-        end = "<br />"
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("bio")
 
     ## getJoinString
     ### returns player join date as a string
     ### formatted mm/dd/yyyy
     @getPageData
     def getJoinString(self):
-        page = self.pageData
-        marker = "Joined WarLight:</font> "
-        end = "<br />"
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("joinString")
         
     ## getJoinDate
     ### returns player join date as a datetime object
@@ -160,98 +232,202 @@ class PlayerParser(WLParser):
     ### formatted mm/dd/yyyy
     @getPageData
     def getMemberString(self):
-        page = self.pageData
-        marker = "Member since</font> "
-        end = "</font>"
-        if marker not in page: return ""
-        return self.getValueFromBetween(page, marker, end)
+        return self.getField("memberString")
 
     ## getMemberDate
     ### returns player membership date as a datetime object
     ### if player is not a member, returns None
     def getMemberDate(self):
-        memberString = self.getMemberString()
+        return self.convertMemberDate(self.getMemberString())
+
+    ## convertMemberDate
+    ### helper for getMemberDate; converts a membership date string
+    @classmethod
+    def convertMemberDate(cls, memberString):
         if memberString == "": return None
-        return self.getDate(memberString)
+        return cls.getDate(memberString)
 
     ## getCurrentGames
     ### returns integer amount of ongoing multi-day games
     @getPageData
     def getCurrentGames(self):
-        page = self.pageData
-        dataRange = self.getValueFromBetween(page, 
-                    "Currently in</font> ", "games")
+        return self.convertCurrentGames(self.getField("currentGamesRange"))
+
+    ## convertCurrentGames
+    ### helper for getCurrentGames; reads the game count from the
+    ### text between "Currently in" and "games"
+    @classmethod
+    def convertCurrentGames(cls, dataRange):
         if "multi-day" not in dataRange: return 0
-        return self.getIntegerValue(dataRange, "")
+        return cls.getIntegerValue(dataRange, "")
 
     ## getPlayedGames
     ### returns integer amount of played games
     @getPageData
     def getPlayedGames(self):
-        page = self.pageData
-        return self.getIntegerValue(page, "Played in</font> ")
+        return self.getField("playedGames")
 
     ## getPercentRT
     ### returns float percentage of real-time games (relative to played)
     @getPageData
     def getPercentRT(self):
-        page = self.pageData
-        dataRange = self.getValueFromBetween(page, "Played in",
-                                             "<br />")
-        return self.getNumericValue(dataRange, " (")
+        return self.convertPercentRT(self.getField("playedRange"))
+
+    ## convertPercentRT
+    ### helper for getPercentRT; reads the real-time percentage from
+    ### the text between "Played in" and the next line break
+    @classmethod
+    def convertPercentRT(cls, dataRange):
+        return cls.getNumericValue(dataRange, " (")
 
     ## getLastSeenString
     ### returns string indicating time since user last performed
     ### an action; minimum value is "less than 15 minutes ago"
     @getPageData
     def getLastSeenString(self):
-        page = self.pageData
-        marker = "Last seen </font>"
-        end = "<font"
-        return self.getValueFromBetween(page,
-                                        marker, end)
+        return self.getField("lastSeenString")
 
     ## getLastSeen
     ### returns floating-point value representing
     ### time since user was last online, in hours
     @getPageData
     def getLastSeen(self):
-        lastSeenString = self.getLastSeenString()
+        return self.convertLastSeen(self.getLastSeenString())
+
+    ## convertLastSeen
+    ### helper for getLastSeen; converts a last-seen string to hours
+    @classmethod
+    def convertLastSeen(cls, lastSeenString):
         if "less than" in lastSeenString:
             return 0
-        return self.timeConvert(lastSeenString)
+        return cls.timeConvert(lastSeenString)
+
+    ## getProfile
+    ### returns a PlayerProfile holding the requested fields
+    ### (fields that weren't requested are left as None)
+    ### every field but the section-based ones (see profileGetters) is
+    ### pulled out of the schema together, in one scan limited to the
+    ### markers they need; section-based fields read only their own
+    ### section, found through the section index (built in one pass)
+    ### raises a ContentError if a requested field can't be extracted
+    ###
+    ### @PARAMS
+    ### 'fields' (iterable): names from PlayerProfile.fields
+    ###     (default: every field)
+    @getPageData
+    @noMemo
+    def getProfile(self, fields=None):
+        if fields is None: fields = PlayerProfile.fields
+        fields = tuple(fields)
+        schemaNames = set()
+        for field in fields:
+            if field in self.profileSchemaFields:
+                schemaNames.add(field)
+            elif field in self.profileDerivedFields:
+                sources = self.profileDerivedFields[field][0]
+                if not isinstance(sources, tuple): sources = (sources,)
+                schemaNames.update(sources)
+            elif field not in self.profileGetters:
+                raise KeyError("Unknown profile field: " + str(field))
+        values, errors = self.schema.extract(self.pageData, schemaNames)
+        profile = PlayerProfile(self.ID)
+        for field in fields:
+            if field in self.profileGetters:
+                value = getattr(self, self.profileGetters[field])()
+            elif field in self.profileDerivedFields:
+                sources, converter = self.profileDerivedFields[field]
+                if not isinstance(sources, tuple): sources = (sources,)
+                for source in sources:
+                    if source in errors:
+                        raise ContentError(errors[source])
+                value = getattr(self, converter)(*[values[source]
+                                                   for source in sources])
+            else:
+                if field in errors:
+                    raise ContentError(errors[field])
+                value = values[field]
+            setattr(profile, field, value)
+        return profile
 
     ## getBootCount
     ### returns number of times a player has been booted
     @getPageData
     def getBootCount(self):
-        page = self.pageData
-        if "never been booted" in page: return 0
-        marker = "This player has been booted "
-        return self.getIntegerValue(page, marker)
+        return self.convertBootCount(self.getField("neverBooted"),
+                                     self.getField("bootRange"))
+
+    ## convertBootCount
+    ### helper for getBootCount; reads the count from the boot range
+    ### raises a ContentError if neither boot marker was found
+    @classmethod
+    def convertBootCount(cls, neverBooted, bootRange):
+        if neverBooted is not None: return 0
+        if bootRange is None:
+            raise ContentError("Missing marker: This player has been booted")
+        return cls.getIntegerValue(bootRange, "")
 
     ## getBootRate
     ### returns percentage of time that a player has been booted
     ### as a floating-point value
     @getPageData
     def getBootRate(self):
+        return self.convertBootRate(self.getField("neverBooted"),
+                                    self.getField("bootRange"))
+
+    ## convertBootRate
+    ### helper for getBootRate; reads the rate from the boot range
+    ### raises a ContentError if neither boot marker was found
+    @classmethod
+    def convertBootRate(cls, neverBooted, bootRange):
+        if neverBooted is not None: return 0.0
+        if bootRange is None:
+            raise ContentError("Missing marker: This player has been booted")
+        return cls.getNumericValue(bootRange, " (")
+
+    ## getSections
+    ### returns the offsets of every <h3 section header on the page,
+    ### found in one pass and reused until the page data changes
+    @getPageData
+    @noMemo
+    def getSections(self):
+        if getattr(self, 'sectionSource', None) is not self.pageData:
+            page = self.pageData
+            sections = list()
+            loc = page.find("<h3")
+            while (loc != -1):
+                sections.append(loc)
+                loc = page.find("<h3", loc + 3)
+            self.sectionData = sections
+            self.sectionSource = page
+        return self.sectionData
+
+    ## getSection
+    ### returns the text between a section header marker and the next
+    ### <h3 header (or the end of the page), using the section index
+    ### instead of searching the whole page; returns None if no header
+    ### starts with the marker
+    ###
+    ### @PARAMS
+    ### 'marker' (string): start of the header, e.g. "<h3>Play Speed</h3>"
+    def getSection(self, marker):
+        sections = self.getSections()
         page = self.pageData
-        if "never been booted" in page: return 0.0
-        marker = "This player has been booted "
-        end = "</font>"
-        dataRange = self.getValueFromBetween(page, marker, end)
-        return self.getNumericValue(dataRange, " (")
+        for i in range(len(sections)):
+            loc = sections[i]
+            if not page.startswith(marker, loc): continue
+            if i + 1 < len(sections): end = sections[i+1]
+            else: end = len(page)
+            return page[loc+len(marker):end]
+        return None
 
     ## getSingleStats
     ### returns a player's single-player stats as a dictionary
     ### formatted {'level name': # of turns (integer)}
     @getPageData
     def getSingleStats(self):
-        page = self.pageData
-        marker = "<h3>Single-player stats</h3>"
         data = dict()
-        if marker not in page: return data
-        dataRange = self.getValueFromBetween(page, marker, "<h3")
+        dataRange = self.getSection("<h3>Single-player stats</h3>")
+        if dataRange is None: return data
         dataSet = dataRange.split('color="#858585')[1:]
         for dataPoint in dataSet:
             levelName = self.getValueFromBetween(dataPoint, '">',
@@ -265,12 +441,9 @@ class PlayerParser(WLParser):
     ### (gameID (integer), game name (string))
     @getPageData
     def getFavoriteGames(self):
-        page = self.pageData
         data = list()
-        marker = "<h3>Favorite Games</h3>"
-        if marker not in page: return data
-        end = "<h3>"
-        dataRange = self.getValueFromBetween(page, marker, end)
+        dataRange = self.getSection("<h3>Favorite Games</h3>")
+        if dataRange is None: return data
         dataSet = dataRange.split("GameID=")[1:]
         for dataPoint in dataSet:
             gameID = self.getIntegerValue(dataPoint, "")
@@ -286,11 +459,9 @@ class PlayerParser(WLParser):
     ### if a player isn't ranked, rank is set to None
     @getPageData
     def getTournaments(self):
-        page = self.pageData
-        marker = "<h3>Tournaments</h3>"
         data = list()
-        if marker not in page: return data
-        dataRange = self.getValueFromBetween(page, marker, "<h3")
+        dataRange = self.getSection("<h3>Tournaments</h3>")
+        if dataRange is None: return data
         dataSet = dataRange.split("- ")[1:]
         for dataPoint in dataSet:
             if dataPoint[0] in string.digits:
@@ -310,11 +481,9 @@ class PlayerParser(WLParser):
     ###  peakRank (integer), peakRating (integer))
     @getPageData
     def getLadderData(self):
-        page = self.pageData
-        marker = "<h3>Ladder Statistics</h3>"
         data = dict()
-        if marker not in page: return data
-        dataRange = self.getValueFromBetween(page, marker, "<h3")
+        dataRange = self.getSection("<h3>Ladder Statistics</h3>")
+        if dataRange is None: return data
         dataSet = dataRange.split("a href=")[1:]
         for dataPoint in dataSet:
             teamID = self.getIntegerValue(dataPoint, "TeamID=")
@@ -346,11 +515,9 @@ class PlayerParser(WLParser):
     ### rankedPercent (float): win percent for all ranked games
     @getPageData
     def getRankedData(self):
-        page = self.pageData
-        marker = "<h3>Ranked Games</h3>"
         data = dict()
-        if marker not in page: return data, 0, 0, 0.0
-        dataRange = self.getValueFromBetween(page, marker, "<h3")
+        dataRange = self.getSection("<h3>Ranked Games</h3>")
+        if dataRange is None: return data, 0, 0, 0.0
         if "No completed ranked games" in dataRange:
             return data, 0, 0, 0.0
         rankedCount = self.getIntegerValue(dataRange,
@@ -381,11 +548,9 @@ class PlayerParser(WLParser):
     ### (previous name (string), date of change (datetime object))
     @getPageData
     def getPreviousNames(self):
-        page = self.pageData
-        marker = "<h3>Previously known as..."
         data = list()
-        if marker not in page: return data
-        dataRange = self.getValueFromBetween(page, marker, "<h3")
+        dataRange = self.getSection("<h3>Previously known as...")
+        if dataRange is None: return data
         dataSet = dataRange.split('&nbsp;&nbsp;&nbsp;')[1:]
         for dataPoint in dataSet:
             name = self.getValueFromBetween(dataPoint, None, " <font")
@@ -401,11 +566,9 @@ class PlayerParser(WLParser):
     ### type is either "Multi-Day Games" or "Real-Time Games"
     @getPageData
     def getPlaySpeed(self):
-        page = self.pageData
-        marker = "<h3>Play Speed</h3>"
         data = dict()
-        if marker not in page: return data
-        dataRange = self.getValueFromBetween(page, marker, "<h3")
+        dataRange = self.getSection("<h3>Play Speed</h3>")
+        if dataRange is None: return data
         typeMarkers = ["Multi-Day Games:", "Real-Time Games:"]
         for typeMarker in typeMarkers:
             markedRange = self.getValueFromBetween(dataRange,
@@ -421,18 +584,20 @@ class PlayerParser(WLParser):
     ### (name (string), author (string), link (string))
     @getPageData
     def getFavoriteMaps(self):
-        page = self.pageData
-        baseURL = "https://warlight.net"
-        marker = "Favorite Maps</h3"
+        return self.convertFavoriteMaps(self.getField("favoriteMapsRange"))
+
+    ## convertFavoriteMaps
+    ### helper for getFavoriteMaps; reads the maps from their range
+    @classmethod
+    def convertFavoriteMaps(cls, dataRange):
         data = list()
-        if marker not in page: return data
-        dataRange = self.getValueFromBetween(page, marker, "</td")
+        if dataRange is None: return data
         dataSet = dataRange.split('a href="')[1:]
         for dataPoint in dataSet:
-            link = self.getValueFromBetween(dataPoint, '', '">')
-            name = self.getValueFromBetween(dataPoint, 
+            link = cls.getValueFromBetween(dataPoint, '', '">')
+            name = cls.getValueFromBetween(dataPoint,
                    "</a> <br>", "<br>")
-            author = self.getValueFromBetween(dataPoint, "by ",
+            author = cls.getValueFromBetween(dataPoint, "by ",
                      "</font>")
             data.append((name, author, link))
         return data
@@ -441,9 +606,45 @@ class PlayerParser(WLParser):
     ### returns integer % value representing achievements completed
     @getPageData
     def getAchievementRate(self):
-        page = self.pageData
-        marker = "<h3>Achievements"
-        if marker not in page: return 0
-        dataRange = self.getValueFromBetween(page, marker, 
-                    "</font>")
-        return self.getIntegerValue(dataRange, "(")
+        return self.convertAchievementRate(self.getField("achievementRange"))
+
+    ## convertAchievementRate
+    ### helper for getAchievementRate; reads the rate from its range
+    @classmethod
+    def convertAchievementRate(cls, dataRange):
+        if dataRange is None: return 0
+        return cls.getIntegerValue(dataRange, "(")
+
+# player profile record
+## compact record returned by PlayerParser.getProfile
+## one slot per field, so bulk sweeps don't pay for a dict per profile
+class PlayerProfile(object):
+
+    ## fields
+    ### every field getProfile can fill in
+    fields = ("exists", "playerName", "clanID", "clanName", "clanIcon",
+              "location", "memberStatus", "level", "points", "email",
+              "link", "tagline", "bio", "joinString", "joinDate",
+              "memberString", "memberDate", "currentGames", "playedGames",
+              "percentRT", "lastSeenString", "lastSeen", "bootCount",
+              "bootRate", "singleStats", "favoriteGames", "tournaments",
+              "ladderData", "rankedData", "previousNames", "playSpeed",
+              "favoriteMaps", "achievementRate")
+
+    __slots__ = ("ID",) + fields
+
+    ## constructor
+    ### takes a player ID; every field starts out as None
+    def __init__(self, playerID):
+        self.ID = playerID
+        for field in self.fields:
+            setattr(self, field, None)
+
+    ## asDict
+    ### returns the record's fields as a dictionary
+    def asDict(self):
+        return dict((field, getattr(self, field))
+                    for field in ("ID",) + self.fields)
+
+    def __repr__(self):
+        return "PlayerProfile(ID=" + repr(self.ID) + ")"
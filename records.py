@@ -0,0 +1,80 @@
+# Imports
+
+## collections - tuple-compatible record types
+from collections import namedtuple
+
+## sys - string interning
+try:
+    from sys import intern
+except ImportError:
+    pass # Python 2: intern is a builtin
+
+# Interning
+
+_clans = dict()
+
+## internString
+### returns the canonical copy of a string, so a name repeated across
+### millions of records (players, clans, titles) is stored once
+### strings that can't be interned (unicode on Python 2) come back as is
+def internString(value):
+    try:
+        return intern(value)
+    except TypeError:
+        return value
+
+## makeClan
+### returns a shared Clan record for a clan ID and name, so every
+### player and post in the same clan points at one object
+def makeClan(clanID, clanName):
+    key = (clanID, clanName)
+    clan = _clans.get(key)
+    if clan is None:
+        clan = _clans.setdefault(key, Clan(clanID, internString(clanName)))
+    return clan
+
+# Record classes
+## namedtuples without a per-instance __dict__: each record costs the
+## same as the plain tuple it replaces, compares equal to it and
+## unpacks the same way, so existing callers keep working
+
+## Clan
+### (clanID, clanName)
+class Clan(namedtuple("Clan", "clanID clanName")):
+    __slots__ = ()
+
+## ClanMember
+### returned by ClanParser.getMembers
+class ClanMember(namedtuple("ClanMember",
+                            "playerID playerName playerTitle isMember")):
+    __slots__ = ()
+
+## LadderPlayer
+### member of a LadderTeam; clan is a Clan ((None, "") if no clan)
+class LadderPlayer(namedtuple("LadderPlayer", "playerName clan")):
+    __slots__ = ()
+
+## LadderTeam
+### returned by LadderRankingParser.getLadderTeams;
+### players is a list of LadderPlayer records
+class LadderTeam(namedtuple("LadderTeam",
+                            "teamID teamRank rankShift teamRating "
+                            "players")):
+    __slots__ = ()
+
+## LadderGame
+### returned by LadderHistoryParser.getGameHistory
+class LadderGame(namedtuple("LadderGame",
+                            "gameID gameTime alphaTeam betaTeam finished "
+                            "endDate expired")):
+    __slots__ = ()
+
+## PostAuthor
+### author of a ForumPost; clan is a Clan or None
+class PostAuthor(namedtuple("PostAuthor", "ID name memberStatus clan")):
+    __slots__ = ()
+
+## ForumPost
+### returned by ForumPageParser.getPosts; author is a PostAuthor
+class ForumPost(namedtuple("ForumPost", "ID author title message time")):
+    __slots__ = ()
@@ -0,0 +1,33 @@
+import sys
+sys.path.append("..")
+
+# automated tests for async_fetcher.py
+
+from nose.tools import *
+from nose.plugins.skip import SkipTest
+
+# async_fetcher is Python 3.7+ only (async def, get_running_loop)
+if sys.version_info < (3, 7):
+    raise SkipTest("async_fetcher needs Python 3.7+")
+
+from async_fetcher import *
+from parser_core import WLParser
+from fake_server import FakeServer
+
+def test_fetchAll():
+    with FakeServer(latency=0.1) as server:
+        parsers = [WLParser(server.baseURL, page=i) for i in range(12)]
+        errors = fetchAll(parsers, maxConcurrent=4)
+        assert_equals(errors, [None] * 12)
+        for i in range(12):
+            assert_equals(parsers[i].pageData, "page /?page=" + str(i))
+        assert (server.maxInFlight <= 4)
+        assert (server.maxInFlight > 1)
+
+def test_fetchAll_skipsLoaded():
+    with FakeServer() as server:
+        parser = WLParser(server.baseURL, page=1)
+        parser.pageData = "already here"
+        assert_equals(fetchAll([parser]), [None])
+        assert_equals(parser.pageData, "already here")
+        assert_equals(server.requests, [])
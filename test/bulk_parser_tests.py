@@ -0,0 +1,70 @@
+import sys
+sys.path.append("..")
+
+# automated tests for bulk_parser.py
+
+from nose.tools import *
+from bulk_parser import *
+from clan_parser import ClanParser
+from parser_core import ContentError
+from fake_server import FakeServer
+import pickle
+import time
+
+class ClanServer(FakeServer):
+
+    def makePage(self, path):
+        clanID = path.split("ID=")[-1]
+        if clanID == "0":
+            return 200, "<p>no clan here</p>"
+        return 200, ("<title>Clan " + clanID + " - Play Risk</title>"
+                     "Number of members:</font> " + clanID + "<br />")
+
+def test_pickleWithoutPage():
+    cp = ClanParser(5)
+    cp.setData("<title>Five - Play Risk</title>")
+    assert_equals(cp.getClanName(), "Five")
+    copy = pickle.loads(pickle.dumps(cp))
+    assert_equals(copy.ID, 5)
+    assert_equals(copy.URL, cp.URL)
+    assert (not hasattr(copy, 'pageData'))
+    assert (not hasattr(copy, 'fieldData'))
+    cp.releaseData()
+    copy = pickle.loads(pickle.dumps(cp))
+    assert_equals(copy.pageZip, None)
+
+def test_parseAll():
+    with ClanServer() as server:
+        parsers = list()
+        for clanID in range(6):
+            cp = ClanParser(clanID)
+            cp.URL = server.baseURL + "ID=" + str(clanID)
+            parsers.append(cp)
+        results = dict()
+        for parser, values in parseAll(parsers,
+                                       ["getClanName", "getMemberCount"],
+                                       fetchers=3, processes=2):
+            assert (not hasattr(parser, 'pageData'))
+            results[parser.ID] = values
+    assert_equals(sorted(results), list(range(6)))
+    assert (isinstance(results[0], ContentError))
+    for clanID in range(1, 6):
+        assert_equals(results[clanID],
+                      {"getClanName": "Clan " + str(clanID),
+                       "getMemberCount": clanID})
+
+def test_parseAll_bounded():
+    with ClanServer() as server:
+        parsers = list()
+        for clanID in range(1, 41):
+            cp = ClanParser(clanID)
+            cp.URL = server.baseURL + "ID=" + str(clanID)
+            parsers.append(cp)
+        results = parseAll(parsers, ["getMemberCount"], fetchers=1,
+                           processes=1, readAhead=1)
+        parser, values = next(results)
+        time.sleep(0.5)
+        assert (len(server.requests) < 10)
+        results.close()
+    for parser in parsers:
+        assert (not hasattr(parser, 'pageData'))
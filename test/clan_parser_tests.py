@@ -8,6 +8,7 @@ requests.packages.urllib3.disable_warnings()
 
 from nose.tools import *
 from clan_parser import *
+from fake_server import FakeServer
 import datetime
 
 # main class tests
@@ -38,5 +39,37 @@ def test_getClans():
     assert (257 in getClans())
     assert (999 not in getClans())
 
+## tests schema-backed getters on a minimal clan page
+def test_clanFields():
+    cp = ClanParser(129)
+    cp.pageData = ('<title>CORP - Play Risk</title>'
+                   'Number of members:</font> 87<br />'
+                   'Link:</font> <a rel="nofollow" href="http://">x</a>'
+                   'Created:</font> 06/30/2016<br />'
+                   'Tagline:</font> from our ashes<br />'
+                   'Bio:</font>  Roleplayers of all kinds.<br />')
+    assert_equals(cp.getClanName(), "CORP")
+    assert_equals(cp.getMemberCount(), 87)
+    assert_equals(cp.getLink(), "")
+    assert_equals(cp.getTagline(), "from our ashes")
+    assert_equals(cp.getCreatedDate(), datetime.date(2016, 6, 30))
+    assert_equals(cp.getBio(), "Roleplayers of all kinds.")
+
+## tests that a cold getClanName reads only the top of the page,
+## in a single request
+def test_getClanName_head():
+    with FakeServer() as server:
+        body = ("<title>CORP - Play Risk</title>" + "x" * 400000 +
+                "Number of members:</font> 87<br />")
+        server.makePage = lambda path: (200, body)
+        cp = ClanParser(129)
+        cp.URL = server.baseURL + "ID=129"
+        assert_equals(cp.getClanName(), "CORP")
+        assert_equals(len(server.requests), 1)
+        assert_true(cp.pagePartial)
+        assert (len(cp.pageData) < len(body))
+        assert_equals(cp.getMemberCount(), 87)
+        assert_equals(len(server.requests), 2)
+
 if __name__ == "__main__":
     test_parserTools()
@@ -0,0 +1,109 @@
+# local stand-ins for the Warlight site, used by fetch tests:
+# FakeServer serves "page <path>" for every GET over a real socket,
+# after an injectable delay; FakeResponse and FakeSession stand in for
+# requests objects in-process (see withSession)
+
+import threading
+import time
+import fetch_core
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+class FakeServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    ## constructor
+    ### 'latency' (float): seconds to wait before answering each request
+    def __init__(self, latency=0.0):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), FakeHandler)
+        self.latency = latency
+        self.requests = list()
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+
+    ## baseURL
+    ### base URL to hand to WLParser-style constructors
+    @property
+    def baseURL(self):
+        return "http://127.0.0.1:" + str(self.server_address[1]) + "/?"
+
+    ## makePage
+    ### returns (status, body) for a request path; override to customize
+    def makePage(self, path):
+        return 200, "page " + path
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+class FakeHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.inFlight += 1
+            server.maxInFlight = max(server.maxInFlight, server.inFlight)
+        try:
+            time.sleep(server.latency)
+            status, body = server.makePage(self.path)
+            body = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.inFlight -= 1
+
+    def log_message(self, *args):
+        pass
+
+# in-process stand-ins
+
+## FakeResponse
+### response with a text body, status code and headers
+class FakeResponse(object):
+
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or dict()
+
+## FakeSession
+### session that records requested URLs and serves "page for <URL>";
+### subclasses override makePage to serve other pages
+class FakeSession(object):
+
+    def __init__(self):
+        self.requested = list()
+
+    def makePage(self, URL):
+        return "page for " + URL
+
+    def get(self, URL, **kwargs):
+        self.requested.append(URL)
+        return FakeResponse(self.makePage(URL))
+
+## withSession
+### runs func() with 'session' shared by every parser
+def withSession(session, func):
+    fetch_core.setSession(session)
+    try:
+        return func()
+    finally:
+        fetch_core.setSession(None)
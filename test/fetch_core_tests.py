@@ -0,0 +1,288 @@
+import sys
+sys.path.append("..")
+
+# automated tests for fetch_core.py
+
+from nose.tools import *
+import time
+from fetch_core import *
+import fetch_core
+import requests
+from parser_core import WLParser, getPageData, getHeadData
+from fake_server import FakeServer, FakeResponse, FakeSession
+
+# session tests
+
+def test_makeSession():
+    session = makeSession(poolConnections=3, poolMaxSize=7)
+    adapter = session.get_adapter("https://www.warlight.net/")
+    assert_equals(adapter._pool_connections, 3)
+    assert_equals(adapter._pool_maxsize, 7)
+    session.close()
+
+def test_getSession():
+    assert (getSession() is getSession())
+
+def test_configureSession():
+    oldSession = getSession()
+    oldSize = sessionSettings['poolMaxSize']
+    configureSession(poolMaxSize=5)
+    try:
+        assert (getSession() is not oldSession)
+        adapter = getSession().get_adapter("https://www.warlight.net/")
+        assert_equals(adapter._pool_maxsize, 5)
+    finally:
+        configureSession(poolMaxSize=oldSize)
+    assert_raises(KeyError, configureSession, notASetting=1)
+
+def test_setSession():
+    fake = FakeSession()
+    setSession(fake)
+    try:
+        parser = WLParser("http://testURL.com/?")
+        parser.getData()
+        assert_equals(parser.pageData, "page for http://testURL.com/?")
+        assert_equals(fake.requested, ["http://testURL.com/?"])
+    finally:
+        setSession(None)
+
+def test_instanceSession():
+    fake = FakeSession()
+    parser = WLParser("http://testURL.com/?")
+    parser.session = fake
+    parser.getData()
+    assert_equals(fake.requested, ["http://testURL.com/?"])
+
+# parallel fetching tests
+
+def test_iterFetched():
+    with FakeServer(latency=0.05) as server:
+        parsers = [WLParser(server.baseURL, Offset=i * 50) for i in range(10)]
+        loaded = list(iterFetched(parsers, workers=4))
+        assert_equals(loaded, parsers)
+        assert_equals([p.pageData for p in loaded],
+                      ["page /?Offset=" + str(i * 50) for i in range(10)])
+        assert (server.maxInFlight <= 4)
+
+def test_iterFetched_close():
+    from itertools import count
+    with FakeServer() as server:
+        parsers = (WLParser(server.baseURL, Offset=i) for i in count())
+        pages = iterFetched(parsers, workers=2, readAhead=2)
+        assert_equals(next(pages).pageData, "page /?Offset=0")
+        pages.close()
+        # let fetches already running finish before the server stops
+        time.sleep(0.2)
+        assert (len(server.requests) <= 4)
+
+# rate limiting and retry tests
+
+class FlakySession(object):
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requested = 0
+
+    def get(self, URL, **kwargs):
+        self.requested += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception): raise response
+        return response
+
+def errorResponse(status, text="error"):
+    return FakeResponse(text, status)
+
+def withBackoff(backoff, func):
+    oldBackoff = getBackoff()
+    setBackoff(backoff)
+    try:
+        return func()
+    finally:
+        setBackoff(oldBackoff)
+
+def test_RateLimiter():
+    limiter = RateLimiter(50, burst=5)
+    start = time.time()
+    for i in range(5):
+        limiter.acquire()
+    assert (time.time() - start < 0.05)
+    for i in range(5):
+        limiter.acquire()
+    assert (time.time() - start >= 0.08)
+
+def test_Backoff():
+    backoff = Backoff(base=1, cap=5, retries=3)
+    for attempt in range(10):
+        delay = backoff.getDelay(attempt)
+        assert (0 <= delay <= min(5, 2 ** attempt))
+
+def test_fetchText_retries():
+    session = FlakySession([IOError("reset"), errorResponse(503),
+                            errorResponse(200, "<h1>Oops</h1>"),
+                            FakeResponse("fine")])
+    response, text, failed = withBackoff(Backoff(base=0.001),
+        lambda: fetchText("http://a/", session, errorMarker="<h1>Oops"))
+    assert_equals((text, failed), ("fine", False))
+    assert_equals(session.requested, 4)
+
+def test_fetchText_gives_up():
+    session = FlakySession([errorResponse(500)] * 3)
+    response, text, failed = withBackoff(Backoff(base=0.001, retries=2),
+        lambda: fetchText("http://a/", session))
+    assert_equals((response.status_code, failed), (500, True))
+    session = FlakySession([IOError("reset")] * 3)
+    assert_raises(IOError, withBackoff, Backoff(base=0.001, retries=2),
+                  lambda: fetchText("http://a/", session))
+    assert_equals(session.requested, 3)
+    session = FlakySession([IOError("reset"), FakeResponse("fine")])
+    assert_raises(IOError, fetchText, "http://a/", session, retry=False)
+
+# decoding tests
+
+## makeResponse
+### builds a requests response the way requests does for these headers
+def makeResponse(body, headers):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update(headers)
+    response.encoding = requests.utils.get_encoding_from_headers(
+        response.headers)
+    response._content = body
+    return response
+
+def test_decodeResponse_fixed():
+    text = u"<title>Jöhn – café</title>" * 20
+    response = makeResponse(text.encode("utf-8"),
+                            {"Content-Type": "text/html"})
+    assert_equals(response.encoding, "ISO-8859-1")
+    assert_equals(decodeResponse(response, "utf-8"), text)
+    response = makeResponse(b"caf\xe9 \xff", {})
+    assert_equals(decodeResponse(response, "utf-8"), u"caf\ufffd \ufffd")
+    assert_equals(decodeResponse(response, "latin-1"), u"caf\xe9 \xff")
+
+def test_decodeResponse_detected():
+    text = u"<title>Jöhn – café</title>" * 20
+    response = makeResponse(text.encode("utf-8"),
+                            {"Content-Type": "text/html; charset=utf-8"})
+    assert_equals(decodeResponse(response), text)
+    response = makeResponse(text.encode("utf-8"), {})
+    assert_equals(response.encoding, None)
+    assert_equals(decodeResponse(response), text)
+
+# adaptive concurrency tests
+
+def test_ConcurrencyController_errors():
+    controller = ConcurrencyController(initial=8, minimum=2)
+    started = controller.acquire()
+    second = controller.acquire()
+    controller.release(started, error=True)
+    assert_equals(controller.limit, 4)
+    # a request started before the cut doesn't cut again
+    controller.release(second, error=True)
+    assert_equals(controller.limit, 4)
+    for i in range(3):
+        controller.release(controller.acquire(), error=True)
+    assert_equals(controller.limit, 2)
+    assert_equals(controller.getStats()["errors"], 5)
+
+def test_ConcurrencyController_growth():
+    controller = ConcurrencyController(initial=2, maximum=12)
+    setConcurrencyController(controller)
+    try:
+        with FakeServer(latency=0.02) as server:
+            parsers = [WLParser(server.baseURL, n=i) for i in range(60)]
+            list(iterFetched(parsers, workers=16))
+            assert (controller.limit > 2)
+            assert (server.maxInFlight <= 12)
+    finally:
+        setConcurrencyController(None)
+
+## stand-in for the time module, advanced by hand
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+def test_ConcurrencyController_recovers():
+    controller = ConcurrencyController(initial=4, minimum=1, maximum=64)
+    clock = FakeClock()
+    realTime = fetch_core.time
+    fetch_core.time = clock
+    try:
+        def request(latency):
+            started = controller.acquire()
+            clock.now += latency
+            controller.release(started)
+        for i in range(100): request(0.02)
+        grown = controller.limit
+        # the server gets permanently slower: a few cuts, then growth
+        for i in range(20): request(0.3)
+        assert (controller.limit < grown)
+        for i in range(300): request(0.3)
+        assert (controller.limit >= grown)
+    finally:
+        fetch_core.time = realTime
+
+# streaming tests
+
+class StreamedResponse(object):
+
+    def __init__(self, body, chunkSize):
+        self.chunks = [body[i:i + chunkSize]
+                       for i in range(0, len(body), chunkSize)]
+        self.encoding = "utf-8"
+        self.status_code = 200
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunkSize):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+def test_readHead():
+    body = (u"<title>Zoë - Play</title>" + u"x" * 100).encode("utf-8")
+    response = StreamedResponse(body, 3)
+    text, complete = readHead(response, [("<title>", " -")])
+    assert_false(complete)
+    assert (text.startswith(u"<title>Zoë -"))
+    assert (response.read < len(response.chunks))
+    assert_true(response.closed)
+    response = StreamedResponse(body, 3)
+    text, complete = readHead(response, ["not there", ("-", "<title>")])
+    assert_true(complete)
+    assert_equals(text, body.decode("utf-8"))
+
+def test_getHead():
+    class HeadParser(WLParser):
+
+        @getHeadData("<b>")
+        def getTop(self):
+            return self.pageData[:10]
+
+        @getPageData
+        def getLength(self):
+            return len(self.pageData)
+
+    with FakeServer() as server:
+        body = "<title>top</title><b>" + "x" * 500000
+        server.makePage = lambda path: (200, body)
+        parser = HeadParser(server.baseURL, p=1)
+        assert_equals(parser.getTop(), "<title>top")
+        assert_true(parser.pagePartial)
+        assert (len(parser.pageData) < len(body))
+        assert_equals(parser.getLength(), len(body))
+        assert_false(parser.pagePartial)
+        assert_equals(len(server.requests), 2)
+        parser = HeadParser(server.baseURL, p=2)
+        parser.streamHead = False
+        assert_equals(parser.getTop(), "<title>top")
+        assert_false(parser.pagePartial)
+        assert_equals(parser.getLength(), len(body))
+        assert_equals(len(server.requests), 3)
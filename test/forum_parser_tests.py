@@ -0,0 +1,157 @@
+import sys
+sys.path.append("..")
+
+# automated tests for forum_parser.py
+
+from nose.tools import *
+from forum_parser import *
+from fake_server import FakeResponse, withSession
+import re
+import datetime
+
+# stand-in session serving a thread of 'length' posts, 20 per page
+
+class ThreadSession(object):
+
+    splitter = ('" cellspacing="0" class="region" style="padding-bottom:'
+                '15px; width: 100%; max-width: 900px;')
+
+    def __init__(self, length):
+        self.length = length
+        self.offsets = list()
+
+    def makePost(self, postID):
+        return (self.splitter + 'PostForDisplay_' + str(postID) + '">'
+                '<font color="#CCCCCC">title</font>: 09/01/2013 04:20:00'
+                '</th><a href="/Profile?p=5">bob</a>'
+                '<div id="PostForDisplay_' + str(postID) + '"> post ' +
+                str(postID) + ' </div>')
+
+    def get(self, URL, **kwargs):
+        offset = int(re.search("Offset=([0-9]+)", URL).group(1))
+        self.offsets.append(offset)
+        postIDs = range(offset, min(offset + 20, self.length))
+        return FakeResponse('<title>Thread - Play Risk</title>Posts ' +
+                            str(offset + 1) + ' - ' +
+                            str(offset + len(postIDs)) + ' of ' +
+                            str(self.length) + '&nbsp;' +
+                            "".join(self.makePost(postID)
+                                    for postID in postIDs))
+
+# thread tests
+
+def test_ForumThreadParser():
+    session = ThreadSession(95)
+    serial = withSession(session, ForumThreadParser(1).getPostData)
+    concurrent = withSession(session,
+                             ForumThreadParser(1, workers=4).getPostData)
+    assert_equals([post[0] for post in serial], list(range(95)))
+    assert_equals([post[0] for post in concurrent], list(range(95)))
+    assert_equals(serial[3][3], "post 3")
+    assert_equals(serial[3][1], (5, "bob", False, None))
+
+## stand-in for a thread that lost posts after its first page was read:
+## later pages report 'shrunk' posts
+class ShrinkingSession(ThreadSession):
+
+    def __init__(self, length, shrunk):
+        ThreadSession.__init__(self, length)
+        self.shrunk = shrunk
+
+    def get(self, URL, **kwargs):
+        if "Offset=0" not in URL: self.length = self.shrunk
+        return ThreadSession.get(self, URL, **kwargs)
+
+def test_ForumThreadParser_earlyStop():
+    for workers in (None, 1, 4):
+        session = ShrinkingSession(195, 60)
+        thread = ForumThreadParser(1, workers=workers)
+        posts = withSession(session, thread.getPostData)
+        assert_equals([post[0] for post in posts], list(range(60)))
+        assert_equals(len(thread.pages), 3)
+
+def test_ForumThreadParser_lowMemory():
+    session = ThreadSession(95)
+    expected = withSession(session, ForumThreadParser(1).getPostData)
+    for mode in ("compress", "drop"):
+        session.offsets = list()
+        thread = ForumThreadParser(1, lowMemory=mode)
+        posts = withSession(session, thread.getPostData)
+        assert_equals(posts, expected)
+        assert_equals(thread.title, "Thread")
+        assert_equals(len(session.offsets), 6)
+        for page in thread.pages:
+            assert_false(hasattr(page, "pageData"))
+            assert_equals(page.pageZip is not None, mode == "compress")
+    assert_raises(ValueError, ForumThreadParser, 1, lowMemory="zip")
+
+def test_ForumThreadSync():
+    import os
+    import shutil
+    import tempfile
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "threads.json")
+    try:
+        session = ThreadSession(45)
+        sync = ForumThreadSync(path)
+        posts = withSession(session, lambda: sync.refresh(1))
+        assert_equals(len(posts), 45)
+        session.length = 67
+        session.offsets = list()
+        posts = withSession(session, lambda: ForumThreadSync(path).refresh(1))
+        assert_equals([post[0] for post in posts], list(range(45, 67)))
+        assert_equals(session.offsets[0], 40)
+        assert_equals(ForumThreadSync(path).checkpoints["1"],
+                      {"length": 67, "postIDs": list(range(60, 67))})
+        session.offsets = list()
+        posts = withSession(session, lambda: ForumThreadSync(path).refresh(1))
+        assert_equals(posts, [])
+        assert_equals(session.offsets, [60, 80])
+    finally:
+        shutil.rmtree(directory)
+
+# subforum tests
+
+class SubforumSession(object):
+
+    def __init__(self, threadCount):
+        self.threadCount = threadCount
+        self.offsets = list()
+
+    def makeThread(self, threadID):
+        lastPost = datetime.datetime(2017, 1, 1) - \
+                   datetime.timedelta(hours=threadID)
+        return ('<tr><td><a href="/Forum/' + str(threadID) + '">Thread ' +
+                str(threadID) + '</a><br /><font color="gray" title="by '
+                'alice.</font></td><td nowrap="nowrap">' + str(threadID) +
+                '</td><td style="padding-right:15px">' +
+                lastPost.strftime("%m/%d/%Y %H:%M:%S") + '      '
+                '<span style="color: #C6C6C6">by bob</span></td></tr>')
+
+    def get(self, URL, **kwargs):
+        offset = int(re.search("Offset=([0-9]+)", URL).group(1))
+        self.offsets.append(offset)
+        threadIDs = range(offset, min(offset + 25, self.threadCount))
+        return FakeResponse('<table><tr><th>Last&nbsp;Post</th></tr>' +
+                            "".join(self.makeThread(threadID)
+                                    for threadID in threadIDs) +
+                            '</table>')
+
+def test_SubforumParser():
+    session = SubforumSession(110)
+    threads = withSession(session,
+                          SubforumParser("General", workers=3).fetchThreads)
+    assert_equals([thread[0] for thread in threads],
+                  ["Thread " + str(i) for i in range(110)])
+    assert_equals(threads[2][1:3], ("alice", 2))
+    assert_equals(threads[2][3], datetime.datetime(2016, 12, 31, 22))
+    assert_equals(threads[2][4], "bob")
+
+def test_SubforumParser_cutoff():
+    session = SubforumSession(1000)
+    cutoff = datetime.datetime(2017, 1, 1) - datetime.timedelta(hours=60)
+    subforum = SubforumParser("General", cutoff, workers=2)
+    threads = withSession(session, subforum.fetchThreads)
+    assert_equals(len(threads), 60)
+    assert (threads[-1][3] > cutoff)
+    assert (max(session.offsets) <= 150)
@@ -0,0 +1,82 @@
+import sys
+sys.path.append("..")
+
+# automated tests for ladder_export.py
+
+from nose.tools import *
+from nose.plugins.skip import SkipTest
+from ladder_export import *
+from ladder_parser import LadderParser, iterGames
+from ladder_parser_tests import HistorySession, RankingSession
+from fake_server import FakeResponse, withSession
+import ladder_export
+from array import array
+import calendar
+import datetime
+
+# exporter tests
+
+def test_exportTeams():
+    session = RankingSession(120, unranked=5)
+    columns = withSession(session, lambda: exportTeams(1))
+    teams = withSession(session, lambda: LadderParser(1).getTeams())
+    assert_equals(len(columns), 120)
+    assert_equals(list(columns["teamID"]), [team[0] for team in teams])
+    assert_equals(list(columns["teamRank"]), [team[1] for team in teams])
+    assert_equals(list(columns["rankShift"]), [team[2] for team in teams])
+    assert_equals(list(columns["teamRating"]), [team[3] for team in teams])
+
+def test_exportTeams_rankedOnly():
+    session = RankingSession(120, unranked=5)
+    columns = withSession(session, lambda: exportTeams(1, rankedOnly=True))
+    assert_equals(list(columns["teamID"]), list(range(115)))
+
+def test_exportGames():
+    latest = datetime.datetime(2017, 1, 1)
+    session = HistorySession(120, latest)
+    session.states = {120: "open", 119: "expired"}
+    columns = withSession(session, lambda: exportGames(1))
+    games = withSession(session, lambda: list(iterGames(1)))
+    assert_equals(len(columns), 120)
+    assert_equals(list(columns["gameID"]), [game[0] for game in games])
+    assert_equals(list(columns["alphaTeam"]), [game[2] for game in games])
+    assert_equals(list(columns["betaTeam"]), [game[3] for game in games])
+    assert_equals(list(columns["finished"]), [game[4] for game in games])
+    assert_equals(list(columns["expired"]), [game[6] for game in games])
+    assert_equals(columns["endTime"][0], missingTime)
+    assert_equals(columns["endTime"][2],
+                  calendar.timegm(games[2][5].timetuple()))
+
+def test_exportGames_since():
+    latest = datetime.datetime(2017, 1, 1)
+    session = HistorySession(1000, latest)
+    since = latest - datetime.timedelta(hours=60)
+    columns = withSession(session, lambda: exportGames(1, since=since))
+    assert_equals(list(columns["gameID"]), list(range(1000, 939, -1)))
+    assert_equals(session.offsets[:2], [0, 50])
+
+def test_toNumpy():
+    if ladder_export.numpy is None: raise SkipTest("numpy not installed")
+    latest = datetime.datetime(2017, 1, 1)
+    session = HistorySession(60, latest)
+    session.states = {60: "open"}
+    arrays = withSession(session, lambda: exportGames(1)).toNumpy()
+    assert_equals(arrays["gameID"].dtype.name, "int64")
+    assert_true(ladder_export.numpy.isnat(arrays["endTime"][0]))
+    assert_equals(arrays["endTime"][1].astype(datetime.datetime),
+                  latest - datetime.timedelta(hours=1))
+    assert_equals(int(arrays["finished"].sum()), 59)
+
+def test_int64Code():
+    for fields in (teamFields, gameFields):
+        for name, typecode, dtype in fields:
+            if dtype != "bool":
+                assert_equals(array(typecode).itemsize, 8)
+
+def test_toNumpy_missing():
+    columns = Columns(gameFields)
+    numpy, ladder_export.numpy = ladder_export.numpy, None
+    try:
+        assert_raises(ImportError, columns.toNumpy)
+    finally:
+        ladder_export.numpy = numpy
@@ -0,0 +1,224 @@
+import sys
+sys.path.append("..")
+
+# automated tests for ladder_parser.py
+
+from nose.tools import *
+from ladder_parser import *
+from fake_server import FakeResponse, withSession
+import datetime
+import re
+import time
+
+# stand-in session serving a ladder history of 'gameCount' games,
+# newest first, one game ending per hour
+
+class HistorySession(object):
+
+    def __init__(self, gameCount, latest):
+        self.gameCount = gameCount
+        self.latest = latest
+        self.states = dict()
+        self.missing = set()
+        self.offsets = list()
+
+    def makeRow(self, gameID):
+        state = self.states.get(gameID, "finished")
+        endDate = self.latest - datetime.timedelta(hours=self.gameCount -
+                                                   gameID)
+        endString = ""
+        if state == "finished":
+            endString = endDate.strftime("%m/%d/%Y %H:%M:%S")
+        alpha = ('<a href="/LadderTeam?LadderTeamID=' + str(gameID * 2) +
+                 '">a</a>')
+        beta = ('<a href="/LadderTeam?LadderTeamID=' + str(gameID * 2 + 1) +
+                '">b</a>')
+        if state == "finished": teams = alpha + " defeated " + beta
+        else: teams = alpha + " vs " + beta
+        expired = ""
+        if state == "expired": expired = " (expired)"
+        return ('<tr style="background-color: inherit">'
+                '<td><a href="/MultiPlayer?GameID=' + str(gameID) + '">'
+                'game</a>' + expired + '</td>'
+                '<td style="white-space: nowrap">' + endString + '</td>'
+                '<td>' + teams + '</td></tr>')
+
+    def get(self, URL, **kwargs):
+        offset = int(re.search("Offset=([0-9]+)", URL).group(1))
+        self.offsets.append(offset)
+        newest = self.gameCount - offset
+        gameIDs = [gameID for gameID in
+                   range(newest, max(0, newest - 50), -1)
+                   if gameID not in self.missing]
+        rows = "".join(self.makeRow(gameID) for gameID in gameIDs)
+        return FakeResponse('<table><thead></thead>' + rows +
+                            '</table><div class="LadderGamesPager">')
+
+# stand-in session serving a ladder of 'teamCount' teams of two,
+# the last 'unranked' of them not ranked yet; the ladder page reports
+# 'reportedCount' teams (to stand in for a ladder that has grown)
+
+class RankingSession(object):
+
+    def __init__(self, teamCount, unranked=0):
+        self.teamCount = teamCount
+        self.unranked = unranked
+        self.reportedCount = teamCount
+        self.offsets = list()
+
+    def makeRow(self, team):
+        rank = "<td>" + str(team + 1) + "</td>"
+        if team >= self.teamCount - self.unranked:
+            rank = "<td>Not Ranked </td>"
+        players = "".join('<a href="/Clans/?ID=%d" title="Clan %d">'
+                          '<img src="/Clans/%d.png"></a>'
+                          '<a href="LadderTeam?LadderTeamID=%d">'
+                          'Player %d</a> ' % (team % 3, team % 3, team % 3,
+                                              team, team * 2 + seat)
+                          for seat in range(2))
+        return ('<tr >' + rank + '<td>' + players + '</td>'
+                '<td>' + str(2000 - team) + '</td></tr>')
+
+    def get(self, URL, **kwargs):
+        if "LadderSeason" in URL:
+            return FakeResponse("<td>There are currently " +
+                                str(self.reportedCount) + " teams")
+        offset = int(re.search("Offset=([0-9]+)", URL).group(1))
+        self.offsets.append(offset)
+        rows = "".join(self.makeRow(team) for team in
+                       range(offset, min(self.teamCount, offset + 50)))
+        return FakeResponse('<table><thead></thead>' + rows +
+                            '</table><table class="LadderTeamsPager">')
+
+# ranking tests
+
+def test_getTeams():
+    session = RankingSession(120, unranked=5)
+    sequential = withSession(session,
+                             lambda: LadderParser(1).getTeams(workers=1))
+    concurrent = withSession(session,
+                             lambda: LadderParser(1).getTeams(workers=8))
+    assert_equals(concurrent, sequential)
+    assert_equals([team[0] for team in concurrent], list(range(120)))
+    assert_equals([team[1] for team in concurrent[-6:]],
+                  [115, 0, 0, 0, 0, 0])
+
+def test_getTeams_rankedOnly():
+    session = RankingSession(220, unranked=150)
+    teams = withSession(session,
+                        lambda: LadderParser(1).getTeams(rankedOnly=True))
+    assert_equals([team[0] for team in teams], list(range(70)))
+
+def test_iterPages_earlyStop():
+    session = RankingSession(500, unranked=380)
+    read = list()
+    def readPages():
+        for rankParser in LadderParser(1).iterPages(rankedOnly=True,
+                                                    workers=2):
+            rankParser.getLadderTeams()
+            read.append(rankParser)
+    withSession(session, readPages)
+    assert_equals(len(read), 3)
+    assert_true(read[-1].hasUnranked)
+    assert (len(session.offsets) < 10)
+
+def test_iterPages_close():
+    session = RankingSession(500)
+    def readFirst():
+        pages = LadderParser(1).iterPages(workers=1)
+        firstPage = next(pages)
+        pages.close()
+        return firstPage
+    firstPage = withSession(session, readFirst)
+    assert_equals(len(firstPage.getLadderTeams()), 50)
+    time.sleep(0.2)
+    assert (len(session.offsets) <= 3)
+
+def test_getTeams_grown():
+    session = RankingSession(175)
+    session.reportedCount = 60
+    teams = withSession(session, lambda: LadderParser(1).getTeams())
+    assert_equals([team[0] for team in teams], list(range(175)))
+    assert_equals(sorted(session.offsets), [0, 50, 100, 150, 200])
+
+# history streaming tests
+
+def test_iterGames():
+    latest = datetime.datetime(2017, 1, 1)
+    session = HistorySession(120, latest)
+    games = withSession(session, lambda: list(iterGames(1)))
+    assert_equals([game[0] for game in games], list(range(120, 0, -1)))
+    assert_equals(games[0][5], latest)
+    assert_equals(games[0][2:5], (240, 241, True))
+
+def test_iterGames_since():
+    latest = datetime.datetime(2017, 1, 1)
+    session = HistorySession(1000, latest)
+    since = latest - datetime.timedelta(hours=60)
+    games = withSession(session,
+                        lambda: list(iterGames(1, since, prefetch=1)))
+    assert_equals(len(games), 61)
+    assert (games[-1][5] >= since)
+    assert (max(session.offsets) <= 100)
+
+# history sync tests
+
+def test_LadderHistorySync():
+    import os
+    import shutil
+    import tempfile
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "checkpoints.json")
+    try:
+        session = HistorySession(200, datetime.datetime(2017, 1, 1))
+        session.states[195] = "open"
+        session.states[190] = "open"
+        newGames, changed = withSession(session,
+                                        lambda: LadderHistorySync(path).sync(7))
+        assert_equals(len(newGames), 200)
+        assert_equals(changed, [])
+        # three new games, one open game finishes, the other expires
+        session.gameCount = 203
+        session.states = {195: "finished", 190: "expired", 202: "open"}
+        session.offsets = list()
+        sync = LadderHistorySync(path)
+        assert_equals(sync.checkpoints["7"],
+                      {"newest": 200, "pending": [190, 195]})
+        newGames, changed = withSession(session, lambda: sync.sync(7))
+        assert_equals([game[0] for game in newGames], [203, 202, 201])
+        assert_equals([game[0] for game in changed], [195, 190])
+        assert_equals(sync.checkpoints["7"],
+                      {"newest": 203, "pending": [202]})
+        assert_equals(session.offsets[0], 0)
+        assert (max(session.offsets) <= 100)
+        # nothing changed: only the first page is read
+        session.offsets = list()
+        newGames, changed = withSession(session,
+                                        lambda: LadderHistorySync(path).sync(7))
+        assert_equals((newGames, changed), ([], []))
+    finally:
+        shutil.rmtree(directory)
+
+def test_LadderHistorySync_missing():
+    import os
+    import shutil
+    import tempfile
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "checkpoints.json")
+    try:
+        session = HistorySession(400, datetime.datetime(2017, 1, 1))
+        session.states[150] = "open"
+        withSession(session, lambda: LadderHistorySync(path).sync(7))
+        # the open game leaves the history: one walk back, then no more
+        session.missing.add(150)
+        session.offsets = list()
+        sync = LadderHistorySync(path)
+        newGames, changed = withSession(session, lambda: sync.sync(7))
+        assert_equals((newGames, changed), ([], []))
+        assert_equals(sync.checkpoints["7"], {"newest": 400, "pending": []})
+        session.offsets = list()
+        withSession(session, lambda: LadderHistorySync(path).sync(7))
+        assert_equals(session.offsets[0], 0)
+        assert (max(session.offsets) <= 100)
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,270 @@
+import sys
+sys.path.append("..")
+
+# automated tests for page_cache.py
+
+from nose.tools import *
+from page_cache import *
+from parser_core import WLParser, getPageData
+import fetch_core
+from fake_server import FakeServer, FakeResponse, withSession
+import os
+import shutil
+import tempfile
+import threading
+import time
+import sys
+
+def makeCache(maxBytes=1024*1024):
+    return DiskCache(tempfile.mkdtemp(), maxBytes)
+
+# disk cache tests
+
+def test_getAndPut():
+    cache = makeCache()
+    try:
+        assert_equals(cache.get("http://a/"), None)
+        cache.put("http://a/", u"café page")
+        assert_equals(cache.get("http://a/"), u"café page")
+        assert_equals(cache.size, len(u"café page".encode("utf-8")))
+        cache.remove("http://a/")
+        assert_equals(cache.get("http://a/"), None)
+        assert_equals(cache.size, 0)
+    finally:
+        shutil.rmtree(cache.path)
+
+def test_ttl():
+    cache = makeCache()
+    try:
+        cache.put("http://a/", "page")
+        oldTime = time.time() - 100
+        os.utime(cache.getPath("http://a/"), (oldTime, oldTime))
+        assert_equals(cache.get("http://a/", ttl=50), None)
+        assert_equals(cache.get("http://a/", ttl=500), "page")
+    finally:
+        shutil.rmtree(cache.path)
+
+def test_eviction():
+    cache = makeCache(maxBytes=25)
+    try:
+        cache.put("http://a/", "a" * 10)
+        cache.put("http://b/", "b" * 10)
+        now = time.time()
+        os.utime(cache.getPath("http://a/"), (now - 20, now - 20))
+        os.utime(cache.getPath("http://b/"), (now - 30, now - 30))
+        cache.get("http://b/")
+        cache.put("http://c/", "c" * 10)
+        assert_equals(cache.get("http://a/"), None)
+        assert_equals(cache.get("http://b/"), "b" * 10)
+        assert_equals(cache.get("http://c/"), "c" * 10)
+        assert (cache.size <= 25)
+    finally:
+        shutil.rmtree(cache.path)
+
+# memory cache tests
+
+def test_memoryGetAndPut():
+    cache = MemoryCache()
+    assert_equals(cache.get("http://a/"), None)
+    cache.put("http://a/", "page")
+    assert_equals(cache.get("http://a/"), "page")
+    assert_equals(cache.get("http://a/", ttl=-1), None)
+    assert_equals(cache.size, sys.getsizeof("page"))
+    cache.remove("http://a/")
+    assert_equals(cache.get("http://a/"), None)
+    assert_equals(cache.size, 0)
+    assert_equals(cache.getStats()["hits"], 1)
+
+def test_memoryEviction():
+    pageSize = sys.getsizeof("a" * 100)
+    cache = MemoryCache(maxBytes=pageSize * 2)
+    cache.put("http://a/", "a" * 100)
+    cache.put("http://b/", "b" * 100)
+    cache.get("http://a/")
+    cache.put("http://c/", "c" * 100)
+    assert_equals(cache.get("http://b/"), None)
+    assert_equals(cache.get("http://a/"), "a" * 100)
+    assert_equals(cache.get("http://c/"), "c" * 100)
+    cache.put("http://d/", "d" * 1000)
+    assert_equals(cache.get("http://d/"), None)
+    assert (cache.size <= cache.maxBytes)
+
+# single-flight tests
+
+def test_singleFlight():
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = list()
+
+    def call():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "result"
+
+    results = list()
+    threads = [threading.Thread(target=lambda: results.append(
+                   flights.run("key", call))) for i in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]: thread.start()
+    while flights.shared < 4: time.sleep(0.01)
+    release.set()
+    for thread in threads: thread.join()
+    assert_equals(results, ["result"] * 5)
+    assert_equals(len(calls), 1)
+    assert_equals(flights.run("key", lambda: "again"), "again")
+
+def test_singleFlightError():
+    flights = SingleFlight()
+
+    def call():
+        raise ValueError("failed")
+
+    assert_raises(ValueError, flights.run, "key", call)
+    assert_equals(flights.flights, dict())
+
+# getData integration
+
+def test_getDataCoalesced():
+    with FakeServer(latency=0.3) as server:
+        parsers = [WLParser(server.baseURL, p=1) for i in range(6)]
+        threads = [threading.Thread(target=parser.getData)
+                   for parser in parsers]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        assert_equals(len(server.requests), 1)
+        assert_equals([parser.pageData for parser in parsers],
+                      ["page /?p=1"] * 6)
+
+def test_getDataNotCoalesced():
+    with FakeServer(latency=0.3) as server:
+        parsers = [WLParser(server.baseURL, p=1) for i in range(4)]
+        parsers[1].encoding = "latin-1"
+        parsers[2].session = fetch_core.makeSession()
+        threads = [threading.Thread(target=parser.getData)
+                   for parser in parsers[:3]]
+        threads.append(threading.Thread(target=lambda:
+                                        parsers[3].getData(useCache=False)))
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        parsers[2].session.close()
+        assert_equals(len(server.requests), 4)
+
+def test_getDataMemoryCache():
+    setMemoryCache(MemoryCache())
+    try:
+        with FakeServer() as server:
+            WLParser(server.baseURL, p=1).getData()
+            parser = WLParser(server.baseURL, p=1)
+            parser.getData()
+            assert_equals(parser.pageData, "page /?p=1")
+            assert_equals(len(server.requests), 1)
+            parser.getData(useCache=False)
+            assert_equals(len(server.requests), 2)
+    finally:
+        setMemoryCache(None)
+
+def test_getDataCache():
+    cache = makeCache()
+    try:
+        with FakeServer() as server:
+            parser = WLParser(server.baseURL, p=1)
+            parser.cache = cache
+            parser.getData()
+            parser.getData()
+            assert_equals(parser.pageData, "page /?p=1")
+            assert_equals(len(server.requests), 1)
+            parser.getData(useCache=False)
+            assert_equals(len(server.requests), 2)
+    finally:
+        shutil.rmtree(cache.path)
+
+# conditional request tests
+
+class ConditionalSession(object):
+
+    def __init__(self, body, useETags=True):
+        self.body = body
+        self.useETags = useETags
+        self.sentHeaders = list()
+
+    def get(self, URL, headers=None, **kwargs):
+        self.sentHeaders.append(headers)
+        if not self.useETags: return FakeResponse(self.body)
+        etag = '"' + str(hash(self.body)) + '"'
+        if headers is not None and headers.get('If-None-Match') == etag:
+            return FakeResponse("", 304)
+        return FakeResponse(self.body, headers={'ETag': etag})
+
+class PollParser(WLParser):
+
+    parses = 0
+
+    @getPageData
+    def getWords(self):
+        PollParser.parses += 1
+        self.isEmpty = (len(self.pageData) == 0)
+        return self.pageData.split()
+
+def pollPage(session):
+    parser = PollParser("http://a/?")
+    return parser, withSession(session, parser.getWords)
+
+def test_ValidatorStore_maxBytes():
+    page = "x" * 1000
+    store = ValidatorStore(maxBytes=3 * sys.getsizeof(page))
+    for i in range(5):
+        store.update("http://%d/" % i, FakeResponse(page), page)
+    assert_equals(store.getStats()["entries"], 3)
+    assert (store.size <= store.maxBytes)
+    assert_equals(store.getHeaders("http://0/"), None)
+    store.update("http://big/", FakeResponse(page * 4), page * 4)
+    assert_equals(store.getStats()["entries"], 3)
+    store.remove("http://4/")
+    assert_equals(store.size, 2 * sys.getsizeof(page))
+
+def test_ValidatorStore():
+    store = ValidatorStore(maxEntries=1)
+    assert_equals(store.getHeaders("http://a/"), None)
+    page = store.update("http://a/", FakeResponse("a", headers={
+                            'ETag': '"1"', 'Last-Modified': "today"}), "a")
+    assert_equals(store.getHeaders("http://a/"),
+                  {'If-None-Match': '"1"', 'If-Modified-Since': "today"})
+    assert (store.update("http://a/", FakeResponse("", 304), "") is page)
+    assert (store.update("http://a/", FakeResponse("a"), "a") is page)
+    assert_equals(store.getHeaders("http://a/"), None)
+    store.update("http://b/", FakeResponse("b"), "b")
+    assert_equals(store.update("http://a/", FakeResponse("", 304), ""), None)
+    assert_equals(store.getStats(),
+                  {"entries": 1, "size": sys.getsizeof("b"), "hits": 1,
+                   "skips": 1, "misses": 2})
+
+def test_conditionalRequests():
+    setValidatorStore(ValidatorStore())
+    PollParser.parses = 0
+    try:
+        session = ConditionalSession("some page text")
+        parser, words = pollPage(session)
+        assert_equals(words, ["some", "page", "text"])
+        parser, words = pollPage(session)
+        assert_equals(session.sentHeaders[1],
+                      {'If-None-Match': '"' + str(hash(session.body)) + '"'})
+        assert_equals(words, ["some", "page", "text"])
+        assert_false(parser.isEmpty)
+        assert_equals(PollParser.parses, 1)
+        session.body = "new page text"
+        parser, words = pollPage(session)
+        assert_equals(words, ["new", "page", "text"])
+        assert_equals(PollParser.parses, 2)
+        session.useETags = False
+        parser, words = pollPage(session)
+        assert_equals(words, ["new", "page", "text"])
+        assert_equals(PollParser.parses, 2)
+        stats = getValidatorStore().getStats()
+        assert_equals(stats.pop("size"), sys.getsizeof(parser.pageData))
+        assert_equals(stats,
+                      {"entries": 1, "hits": 1, "skips": 1, "misses": 2})
+    finally:
+        setValidatorStore(None)
@@ -6,6 +6,8 @@ sys.path.append("..")
 from nose.tools import *
 from parser_core import *
 from datetime import *
+import re
+import time
 
 # decorator test
 
@@ -24,6 +26,132 @@ def test_getPageData():
     pdTester.testFunction()
     assert (pdTester.pageData == "abacus")
 
+class MemoTester(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def getData(self):
+        self.pageData = "abacus"
+
+    @getPageData
+    def countLetters(self, letter, upper=False):
+        self.calls += 1
+        if upper: letter = letter.upper()
+        return [self.pageData.count(letter)]
+
+    @getPageData
+    def getLetters(self):
+        self.calls += 1
+        return {"a": [self.pageData.count("a")]}
+
+    @getPageData
+    def failTyped(self):
+        self.calls += 1
+        raise TypeError("bad page")
+
+    @getPageData
+    @noMemo
+    def countCalls(self):
+        self.calls += 1
+        return self.calls
+
+def test_getPageData_memo():
+    memoTester = MemoTester()
+    assert_equals(memoTester.countLetters("a"), [2])
+    result = memoTester.countLetters("a")
+    result.append(0)
+    assert_equals(memoTester.countLetters("a"), [2])
+    assert_equals(memoTester.calls, 1)
+    assert_equals(memoTester.countLetters("a", upper=True), [0])
+    assert_equals(memoTester.countLetters("b"), [1])
+    assert_equals(memoTester.calls, 3)
+    memoTester.pageData = "aardvark"
+    assert_equals(memoTester.countLetters("a"), [3])
+    assert_equals(memoTester.countLetters("r"), [2])
+    assert_equals(memoTester.calls, 5)
+
+def test_getPageData_memoNested():
+    memoTester = MemoTester()
+    result = memoTester.getLetters()
+    result["a"].append(0)
+    memoTester.getLetters()["a"].append(0)
+    assert_equals(memoTester.getLetters(), {"a": [2]})
+    assert_equals(memoTester.calls, 3)
+
+def test_getPageData_memoTypeError():
+    memoTester = MemoTester()
+    assert_raises(TypeError, memoTester.failTyped)
+    assert_equals(memoTester.calls, 1)
+
+class LadderPageTester(WLParser):
+
+    def __init__(self, page):
+        self.pageData = page
+
+    @getPageData
+    def getTeamCount(self):
+        return len(re.findall('<tr ><td>([0-9]+)</td>', self.pageData))
+
+    @getPageData
+    @noMemo
+    def countTeams(self):
+        return len(re.findall('<tr ><td>([0-9]+)</td>', self.pageData))
+
+def test_getPageData_memoFaster():
+    page = "".join('<tr ><td>%d</td><td><a href="/Clans/?ID=1">x</a>'
+                   '</td></tr>' % team for team in range(50)) * 20
+    tester = LadderPageTester(page)
+    assert_equals(tester.getTeamCount(), 1000)
+    started = time.time()
+    for i in range(200): tester.countTeams()
+    parseTime = time.time() - started
+    started = time.time()
+    for i in range(200): tester.getTeamCount()
+    hitTime = time.time() - started
+    assert (hitTime * 10 < parseTime)
+
+def test_noMemo():
+    memoTester = MemoTester()
+    assert_equals(memoTester.countCalls(), 1)
+    assert_equals(memoTester.countCalls(), 2)
+
+class ReleaseTester(WLParser):
+
+    def __init__(self):
+        self.URL = "http://testURL.com/?"
+        self.fetches = 0
+
+    def fetchData(self, loop=True, useCache=True):
+        self.fetches += 1
+        return "fetched page"
+
+    @getPageData
+    def getLength(self):
+        return len(self.pageData)
+
+    @getPageData
+    def getFirstWord(self):
+        return self.pageData.split()[0]
+
+def test_releaseData():
+    parser = ReleaseTester().setData("saved page")
+    parser.releaseData(getters=["getLength"])
+    assert_false(hasattr(parser, "pageData"))
+    assert_equals(parser.getLength(), 10)
+    assert_false(hasattr(parser, "pageData"))
+    assert_equals(parser.getFirstWord(), "saved")
+    assert_equals(parser.pageData, "saved page")
+    assert_equals(parser.pageZip, None)
+    assert_equals(parser.fetches, 0)
+    parser.releaseData(compress=False)
+    assert_equals(parser.getLength(), 10)
+    assert_equals(parser.fetches, 0)
+    parser.setData("other page").releaseData(compress=False)
+    assert_equals(parser.getLength(), 12)
+    assert_equals(parser.fetches, 1)
+    assert_equals(parser.pageData, "fetched page")
+
 # main parser class test
 
 ## no explicit test for makeURL
@@ -129,4 +257,122 @@ def test_trimString():
 
                  """
     assert_equals(WLParser.trimString(testString), 
-                  "this is the only text that matters")
\ No newline at end of file
+                  "this is the only text that matters")
+
+# scanner tests
+
+def test_Scanner():
+    scanner = Scanner("id=123&name=abc&id=45")
+    assert_equals(scanner.skipTo("id="), 0)
+    assert_equals(scanner.readTyped("0123456789"), "123")
+    assert_equals(scanner.readBetween("name=", "&"), "abc")
+    assert_equals(scanner.find("id="), 16)
+    scanner.skipTo("id=")
+    assert_equals(scanner.readTyped("0123456789"), "45")
+    assert_equals(scanner.readTyped("0123456789"), "")
+    assert_equals(scanner.readRest(), "")
+    assert_raises(ContentError, scanner.skipTo, "id=")
+    assert_raises(ContentError, Scanner("abc").readUntil, "d")
+
+def test_getValueFromBetween_errors():
+    assert_raises(ContentError, WLParser.getValueFromBetween,
+                  "abacus", "x", "a")
+    assert_raises(ContentError, WLParser.getValueFromBetween,
+                  "abacus", "a", "x")
+    assert_raises(ContentError, WLParser.getTypedValue,
+                  "abacus", "x", "abc")
+    assert_raises(ContentError, WLParser.getTypedValue,
+                  "abacus", "s", "abc")
+
+# extraction schema tests
+
+def test_ExtractionSchema():
+    schema = ExtractionSchema([
+        ("name", "<title>", " -", "text"),
+        ("level", "Level ", None, "integer"),
+        ("bigLevel", "<b>Level ", None, "integer"),
+        ("points", "points: ", None, "grouped"),
+        ("date", "Joined: ", "<br", WLParser.getDate),
+        ("clan", "Clan: ", None, "integer", None),
+        ("email", "E-mail: ", "<br", "text"),
+    ])
+    page = ("<title>someone - Warlight</title><b>Level 52</b> "
+            "points: 12,345 Joined: 09/01/2013<br />")
+    values, errors = schema.extract(page)
+    assert_equals(values["name"], "someone")
+    assert_equals(values["level"], 52)
+    assert_equals(values["bigLevel"], 52)
+    assert_equals(values["points"], 12345)
+    assert_equals(values["date"], date(2013, 9, 1))
+    assert_equals(values["clan"], None)
+    assert ("email" in errors)
+    values, errors = schema.extract(page, ["level", "points"])
+    assert_equals(values, {"level": 52, "points": 12345})
+    assert_equals(errors, dict())
+
+def test_ExtractionSchema_badField():
+    schema = ExtractionSchema([
+        ("name", "<title>", " -", "text"),
+        ("date", "Joined: ", "<br", WLParser.getDate),
+    ])
+    values, errors = schema.extract("<title>someone - x Joined: 2013<br")
+    assert_equals(values, {"name": "someone"})
+    assert ("date" in errors)
+
+def test_getField():
+    class SchemaTester(WLParser):
+        schema = ExtractionSchema([("name", "<title>", " -", "text"),
+                                   ("level", "Level ", None, "integer")])
+    tester = SchemaTester()
+    tester.pageData = "<title>abc - def</title> Level x"
+    assert_equals(tester.getField("name"), "abc")
+    assert_raises(ContentError, tester.getField, "level")
+    tester.pageData = "<title>xyz - def</title> Level 3"
+    assert_equals(tester.getField("name"), "xyz")
+    assert_equals(tester.getField("level"), 3)
+
+# offline loading tests
+
+def test_offlineLoading():
+    import mmap
+    import os
+    import tempfile
+    handle, path = tempfile.mkstemp(suffix=".html")
+    with os.fdopen(handle, "wb") as fout:
+        fout.write(u"<p>first</p><p>sécond</p>".encode("utf-8"))
+    try:
+        parser = WLParser().loadFile(path)
+        assert_equals(parser.pageData, u"<p>first</p><p>sécond</p>")
+        with open(path, "rb") as fin:
+            region = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+            parser = WLParser().loadMmap(region, 12)
+            region.close()
+        assert_equals(parser.pageData, u"<p>sécond</p>")
+        assert_equals(WLParser().setData("abc").pageData, "abc")
+    finally:
+        os.remove(path)
+
+def test_offlineNoRequestsImport():
+    import subprocess
+    import os
+    code = ("import sys; "
+            "from player_parser import PlayerParser; "
+            "pp = PlayerParser(1).setData('<title>abc - x</title>'); "
+            "pp.getPlayerName(); "
+            "print('requests' in sys.modules)")
+    here = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.check_output([sys.executable, "-c", code],
+                                     cwd=os.path.join(here, ".."))
+    assert_equals(output.strip(), b"False")
+
+def test_offlineWithoutRequests():
+    import subprocess
+    import os
+    code = ("import sys; sys.modules['requests'] = None; "
+            "from player_parser import PlayerParser; "
+            "pp = PlayerParser(1).setData('<title>abc - x</title>'); "
+            "print(pp.getPlayerName())")
+    here = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.check_output([sys.executable, "-c", code],
+                                     cwd=os.path.join(here, ".."))
+    assert_equals(output.strip(), b"abc")
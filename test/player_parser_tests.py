@@ -8,6 +8,8 @@ requests.packages.urllib3.disable_warnings()
 
 from nose.tools import *
 from player_parser import *
+from fake_server import FakeServer
+import datetime
 
 # main class tests
 ## constructor test
@@ -16,3 +18,98 @@ def test_playerParser():
     pp = PlayerParser(3022124041)
     assert_equals(pp.ID, 3022124041)
     assert_equals(pp.URL, "https://www.warlight.net/Profile?p=3022124041")
+
+
+## profile snapshot test on a minimal profile page
+def test_getProfile():
+    pp = PlayerParser(3022124041)
+    pp.pageData = ('<title>knyte - Play Risk</title>'
+                   '<big><b>Level 55</b></big>'
+                   'Points earned in last 30 days:</font> 12,345<br />'
+                   'Joined WarLight:</font> 01/02/2013<br />'
+                   'Currently in</font> 12 multi-day games'
+                   'Played in</font> 1234 games (20% real-time)<br />'
+                   'Last seen </font>less than 15 minutes ago<font')
+    profile = pp.getProfile(["playerName", "level", "points", "joinDate",
+                             "currentGames", "playedGames", "percentRT",
+                             "lastSeen", "memberDate"])
+    assert_equals(profile.ID, 3022124041)
+    assert_equals(profile.playerName, "knyte")
+    assert_equals(profile.level, 55)
+    assert_equals(profile.points, 12345)
+    assert_equals(profile.joinDate, datetime.date(2013, 1, 2))
+    assert_equals(profile.currentGames, 12)
+    assert_equals(profile.playedGames, 1234)
+    assert_equals(profile.percentRT, 20.0)
+    assert_equals(profile.lastSeen, 0)
+    assert_equals(profile.memberDate, None)
+    assert_equals(profile.email, None)
+    assert (not hasattr(profile, '__dict__'))
+    assert_raises(ContentError, pp.getProfile, ["email"])
+    assert_raises(KeyError, pp.getProfile, ["notAField"])
+
+## getProfile fields formerly read by their own getters, from a
+## generator of field names
+def test_getProfile_oneScan():
+    pp = PlayerParser(3022124041)
+    pp.pageData = ('<title>knyte - Play Risk</title>'
+                   '<a href="/Clans/?ID=7" title="x"><img border="0" />'
+                   ' Clan Seven </a>'
+                   '<img id="MemberIcon" title="WarLight Member" />'
+                   'Player-supplied link:</font> <a href="x">my site</a>'
+                   'This player has been booted 3 times (1.5%)</font>'
+                   '<h3>Achievements</h3> (42%)</font>'
+                   '<h3>Favorite Maps</h3><a href="/Map/1">pic</a> <br>'
+                   'Earth<br><font>by someone</font></td>')
+    fields = ("exists", "clanName", "memberStatus", "link", "bootCount",
+              "bootRate", "achievementRate", "favoriteMaps")
+    profile = pp.getProfile(field for field in fields)
+    assert_equals(profile.exists, True)
+    assert_equals(profile.clanName, "Clan Seven")
+    assert_equals(profile.memberStatus, True)
+    assert_equals(profile.link, "my site")
+    assert_equals(profile.bootCount, 3)
+    assert_equals(profile.bootRate, 1.5)
+    assert_equals(profile.achievementRate, 42)
+    assert_equals(profile.favoriteMaps, [("Earth", "someone", "/Map/1")])
+    for field in fields:
+        getter = {"exists": pp.playerExists, "clanName": pp.getClanName,
+                  "memberStatus": pp.getMemberStatus, "link": pp.getLink,
+                  "bootCount": pp.getBootCount, "bootRate": pp.getBootRate,
+                  "achievementRate": pp.getAchievementRate,
+                  "favoriteMaps": pp.getFavoriteMaps}[field]
+        assert_equals(getter(), getattr(profile, field))
+    pp.pageData = "Sorry, the requested player was not found."
+    profile = pp.getProfile(["exists", "clanName", "memberStatus"])
+    assert_equals((profile.exists, profile.clanName, profile.memberStatus),
+                  (False, "", False))
+
+## section index test
+def test_getSection():
+    pp = PlayerParser(3022124041)
+    pp.pageData = ('<h2>x</h2><h3>Play Speed</h3>speed<h3>Previously known '
+                   'as...</h3>names<h3>Tournaments</h3>tourneys')
+    assert_equals(pp.getSections(), [10, 34, 70])
+    assert_equals(pp.getSection("<h3>Play Speed</h3>"), "speed")
+    assert_equals(pp.getSection("<h3>Previously known as..."),
+                  "</h3>names")
+    assert_equals(pp.getSection("<h3>Tournaments</h3>"), "tourneys")
+    assert_equals(pp.getSection("<h3>Ranked Games</h3>"), None)
+    assert_equals(pp.getTournaments(), [])
+
+## tests that cold head getters read only the top of the page, in a
+## single request
+def test_headGetters():
+    with FakeServer() as server:
+        body = ('<title>Player - Play Risk</title>' + "x" * 400000 +
+                '<big><b>Level 54</b></big>')
+        server.makePage = lambda path: (200, body)
+        pp = PlayerParser(3022124041)
+        pp.URL = server.baseURL + "p=3022124041"
+        assert_equals(pp.getPlayerName(), "Player")
+        assert_equals(len(server.requests), 1)
+        assert_true(pp.pagePartial)
+        pp = PlayerParser(3022124041)
+        pp.URL = server.baseURL + "p=3022124041"
+        assert_true(pp.playerExists())
+        assert_equals(len(server.requests), 2)
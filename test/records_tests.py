@@ -0,0 +1,33 @@
+import sys
+sys.path.append("..")
+
+# automated tests for records.py
+
+from nose.tools import *
+from records import *
+import pickle
+
+def test_tupleCompatible():
+    member = ClanMember(5, "Player", "Leader", True)
+    assert_equals(member, (5, "Player", "Leader", True))
+    playerID, playerName, playerTitle, isMember = member
+    assert_equals(playerName, "Player")
+    assert_equals(member.playerTitle, "Leader")
+    assert_equals(member[3], True)
+    assert_false(hasattr(member, "__dict__"))
+
+def test_pickle():
+    team = LadderTeam(1, 2, 0, 1500,
+                      [LadderPlayer("Player", makeClan(3, "Clan"))])
+    assert_equals(pickle.loads(pickle.dumps(team)), team)
+
+def test_internString():
+    name = "".join(["Pl", "ayer"])
+    assert_true(internString(name) is internString("Player"))
+
+def test_makeClan():
+    first = makeClan(7, "".join(["Cl", "an"]))
+    assert_true(makeClan(7, "Clan") is first)
+    assert_equals(first, (7, "Clan"))
+    assert_equals(makeClan(None, ""), (None, ""))
+    assert_false(makeClan(8, "Clan") is first)